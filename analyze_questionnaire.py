@@ -4,156 +4,199 @@ Analyze the ShakaPT Comprehensive Lifestyle and Wellness Questionnaire
 Extract patterns, sections, and create a structured overview
 """
 
+import argparse
 import json
 import re
 from collections import defaultdict, Counter
 
-def analyze_questionnaire(json_file_path):
-    """Analyze the questionnaire structure and patterns"""
-    
+from extract_form_fields import OPTION_SETS, OPTION_SET_REF, expand_options, load_form, write_json
+
+FIELDS_FILE = '/Users/blakelange/vibelux-app/shakapt_questionnaire_fields.json'
+SUMMARY_FILE = '/Users/blakelange/vibelux-app/shakapt_questionnaire_summary.json'
+
+def load_summary(json_file_path):
+    """A summary written by main(), expanding option-set references if it was normalized"""
     with open(json_file_path, 'r', encoding='utf-8') as f:
-        form_data = json.load(f)
+        summary = json.load(f)
+    option_sets = summary.pop(OPTION_SETS, None)
+    return summary if option_sets is None else expand_options(summary, option_sets)
+
+# Keywords matched against the lower-cased field name
+# Food preferences (many fields seem to be food items)
+FOOD_KEYWORDS = ['chicken', 'turkey', 'beef', 'fish', 'vegetable', 'fruit', 'grain',
+                 'dairy', 'cheese', 'milk', 'bread', 'rice', 'pasta', 'bean', 'nut']
+PERSONAL_KEYWORDS = ['name', 'email', 'phone', 'address', 'age', 'birth', 'gender']
+PERSONAL_TYPES = ['email', 'phone', 'address']
+HEALTH_KEYWORDS = ['health', 'medical', 'condition', 'symptom', 'pain', 'injury',
+                   'medication', 'allergy', 'exercise', 'activity', 'sleep', 'stress']
+
+# field_config keys copied into the detailed field summary
+SUMMARY_CONFIG_KEYS = ['likert_id', 'custom_html', 'classes', 'in_section']
+
+# Each classifier takes (field, lower-cased name) and returns the field's
+# entry for its analysis section, or None if the field does not belong there
+
+def required_entry(field, field_name):
+    if field['required']:
+        return {
+            'name': field['name'],
+            'type': field['type'],
+            'field_key': field['field_key'],
+            'order': field['field_order']
+        }
+
+def likert_entry(field, field_name):
+    # Likert scale fields (based on options pattern)
+    if field['options'] and len(field['options']) > 0:
+        option_labels = [opt.get('label', '') for opt in field['options'] if isinstance(opt, dict)]
+        if any('strongly' in label.lower() for label in option_labels):
+            return {
+                'name': field['name'],
+                'field_key': field['field_key'],
+                'options': field['options'],
+                'likert_id': field['field_config'].get('likert_id', None)
+            }
+
+def food_entry(field, field_name):
+    if any(keyword in field_name for keyword in FOOD_KEYWORDS) or \
+       (field['options'] and any('like' in str(opt).lower() for opt in field['options'])):
+        return {
+            'name': field['name'],
+            'type': field['type'],
+            'field_key': field['field_key'],
+            'options': field['options']
+        }
+
+def personal_entry(field, field_name):
+    if any(keyword in field_name for keyword in PERSONAL_KEYWORDS) or field['type'] in PERSONAL_TYPES:
+        return {
+            'name': field['name'],
+            'type': field['type'],
+            'field_key': field['field_key'],
+            'required': field['required']
+        }
+
+def health_entry(field, field_name):
+    if any(keyword in field_name for keyword in HEALTH_KEYWORDS):
+        return {
+            'name': field['name'],
+            'type': field['type'],
+            'field_key': field['field_key'],
+            'options': field['options'] if field['options'] else None
+        }
+
+def conditional_entry(field, field_name):
+    # Conditional logic detection
+    field_config = field['field_config']
+    if 'hide_field' in field_config or 'show_field' in field_config:
+        return {
+            'field_name': field['name'],
+            'field_key': field['field_key'],
+            'logic': {k: v for k, v in field_config.items() 
+                     if 'hide' in k or 'show' in k or 'cond' in k}
+        }
+
+# (analysis section, classifier), run in this order on every field
+CLASSIFIERS = (
+    ('required_fields', required_entry),
+    ('likert_scales', likert_entry),
+    ('food_preferences', food_entry),
+    ('personal_info', personal_entry),
+    ('health_assessments', health_entry),
+    ('conditional_logic', conditional_entry),
+)
+
+def summarize_field(field):
+    """Detailed summary entry for one field"""
+    field_summary = {
+        'order': field['field_order'],
+        'name': field['name'],
+        'field_key': field['field_key'],
+        'type': field['type'],
+        'required': field['required'],
+        'description': field['description'],
+        'default_value': field['default_value'],
+        'options_count': len(field['options']) if field['options'] else 0,
+        'has_conditional_logic': bool(field['field_config'].get('hide_field') or 
+                                    field['field_config'].get('show_field')),
+        'special_config': {k: v for k, v in field['field_config'].items() 
+                         if k in SUMMARY_CONFIG_KEYS}
+    }
+    
+    # Add options if they exist and are manageable
+    if field['options'] and len(field['options']) <= 20:
+        field_summary['options'] = field['options']
+    elif field['options'] and len(field['options']) > 20:
+        field_summary['options_preview'] = field['options'][:5]
+        field_summary['options_note'] = f"Showing 5 of {len(field['options'])} options"
     
+    return field_summary
+
+def analyze_form(form_data):
+    """(analysis, detailed field summary) for a loaded form, from one pass over its fields
+
+    Every field goes through each classifier and the summary in turn, so
+    a normalized form's fields are each expanded once
+    """
     fields = form_data['fields']
+    sections = {section: [] for section, _ in CLASSIFIERS}
+    field_types = Counter()
+    summary = []
     
+    for field in fields:
+        field_name = field['name'].lower() if field['name'] else ''
+        field_types[field['type']] += 1
+        for section, classify in CLASSIFIERS:
+            entry = classify(field, field_name)
+            if entry is not None:
+                sections[section].append(entry)
+        summary.append(summarize_field(field))
+    
+    required = len(sections['required_fields'])
     analysis = {
         'form_metadata': {
             'name': form_data['name'],
             'form_key': form_data['form_key'],
             'total_fields': len(fields),
-            'required_fields': sum(1 for f in fields if f['required']),
-            'optional_fields': sum(1 for f in fields if not f['required'])
+            'required_fields': required,
+            'optional_fields': len(fields) - required
         },
-        'field_types': {},
+        'field_types': dict(field_types),
         'sections': [],
-        'required_fields': [],
-        'conditional_logic': [],
-        'likert_scales': [],
-        'food_preferences': [],
-        'personal_info': [],
-        'health_assessments': [],
+        'required_fields': sections['required_fields'],
+        'conditional_logic': sections['conditional_logic'],
+        'likert_scales': sections['likert_scales'],
+        'food_preferences': sections['food_preferences'],
+        'personal_info': sections['personal_info'],
+        'health_assessments': sections['health_assessments'],
         'lifestyle_questions': []
     }
-    
-    # Analyze field types
-    field_type_counts = Counter(f['type'] for f in fields)
-    analysis['field_types'] = dict(field_type_counts)
-    
-    # Categorize fields by patterns
-    for field in fields:
-        field_name = field['name'].lower() if field['name'] else ''
-        field_type = field['type']
-        
-        # Required fields
-        if field['required']:
-            analysis['required_fields'].append({
-                'name': field['name'],
-                'type': field['type'],
-                'field_key': field['field_key'],
-                'order': field['field_order']
-            })
-        
-        # Likert scale fields (based on options pattern)
-        if field['options'] and len(field['options']) > 0:
-            option_labels = [opt.get('label', '') for opt in field['options'] if isinstance(opt, dict)]
-            if any('strongly' in label.lower() for label in option_labels):
-                analysis['likert_scales'].append({
-                    'name': field['name'],
-                    'field_key': field['field_key'],
-                    'options': field['options'],
-                    'likert_id': field['field_config'].get('likert_id', None)
-                })
-        
-        # Food preferences (many fields seem to be food items)
-        food_keywords = ['chicken', 'turkey', 'beef', 'fish', 'vegetable', 'fruit', 'grain', 
-                        'dairy', 'cheese', 'milk', 'bread', 'rice', 'pasta', 'bean', 'nut']
-        if any(keyword in field_name for keyword in food_keywords) or \
-           (field['options'] and any('like' in str(opt).lower() for opt in field['options'])):
-            analysis['food_preferences'].append({
-                'name': field['name'],
-                'type': field['type'],
-                'field_key': field['field_key'],
-                'options': field['options']
-            })
-        
-        # Personal information fields
-        personal_keywords = ['name', 'email', 'phone', 'address', 'age', 'birth', 'gender']
-        if any(keyword in field_name for keyword in personal_keywords) or field_type in ['email', 'phone', 'address']:
-            analysis['personal_info'].append({
-                'name': field['name'],
-                'type': field['type'],
-                'field_key': field['field_key'],
-                'required': field['required']
-            })
-        
-        # Health assessment fields
-        health_keywords = ['health', 'medical', 'condition', 'symptom', 'pain', 'injury', 
-                          'medication', 'allergy', 'exercise', 'activity', 'sleep', 'stress']
-        if any(keyword in field_name for keyword in health_keywords):
-            analysis['health_assessments'].append({
-                'name': field['name'],
-                'type': field['type'],
-                'field_key': field['field_key'],
-                'options': field['options'] if field['options'] else None
-            })
-        
-        # Conditional logic detection
-        field_config = field['field_config']
-        if 'hide_field' in field_config or 'show_field' in field_config:
-            analysis['conditional_logic'].append({
-                'field_name': field['name'],
-                'field_key': field['field_key'],
-                'logic': {k: v for k, v in field_config.items() 
-                         if 'hide' in k or 'show' in k or 'cond' in k}
-            })
-    
-    return analysis
+    return analysis, summary
+
+def analyze_questionnaire(json_file_path):
+    """Analyze the questionnaire structure and patterns"""
+    return analyze_form(load_form(json_file_path))[0]
 
 def generate_field_summary(json_file_path):
     """Generate a detailed field summary"""
-    
-    with open(json_file_path, 'r', encoding='utf-8') as f:
-        form_data = json.load(f)
-    
-    fields = form_data['fields']
-    
-    summary = []
-    
-    for i, field in enumerate(fields, 1):
-        field_summary = {
-            'order': field['field_order'],
-            'name': field['name'],
-            'field_key': field['field_key'],
-            'type': field['type'],
-            'required': field['required'],
-            'description': field['description'],
-            'default_value': field['default_value'],
-            'options_count': len(field['options']) if field['options'] else 0,
-            'has_conditional_logic': bool(field['field_config'].get('hide_field') or 
-                                        field['field_config'].get('show_field')),
-            'special_config': {k: v for k, v in field['field_config'].items() 
-                             if k in ['likert_id', 'custom_html', 'classes', 'in_section']}
-        }
-        
-        # Add options if they exist and are manageable
-        if field['options'] and len(field['options']) <= 20:
-            field_summary['options'] = field['options']
-        elif field['options'] and len(field['options']) > 20:
-            field_summary['options_preview'] = field['options'][:5]
-            field_summary['options_note'] = f"Showing 5 of {len(field['options'])} options"
-        
-        summary.append(field_summary)
-    
-    return summary
+    return analyze_form(load_form(json_file_path))[1]
 
 def main():
-    json_file = '/Users/blakelange/vibelux-app/shakapt_questionnaire_fields.json'
+    parser = argparse.ArgumentParser(description="Analyze the questionnaire fields extracted by extract_form_fields.py")
+    parser.add_argument('json_file', nargs='?', default=FIELDS_FILE,
+                        help="fields JSON, plain or normalized (default: %(default)s)")
+    parser.add_argument('-o', '--output', default=SUMMARY_FILE, help="summary JSON to write")
+    parser.add_argument('--normalize', action='store_true',
+                        help=f"store each distinct options list once under '{OPTION_SETS}' and refer "
+                             f"to it by index from '{OPTION_SET_REF}'")
+    args = parser.parse_args()
+    json_file = args.json_file
     
     print("🔍 ANALYZING SHAKAPT COMPREHENSIVE LIFESTYLE AND WELLNESS QUESTIONNAIRE")
     print("=" * 80)
     
-    # Run analysis
-    analysis = analyze_questionnaire(json_file)
+    # Load the form once; the analysis and the detailed summary come from one pass
+    analysis, field_summary = analyze_form(load_form(json_file))
     
     # Print form metadata
     meta = analysis['form_metadata']
@@ -214,17 +257,14 @@ def main():
         for logic in analysis['conditional_logic']:
             print(f"  • {logic['field_name']}: {logic['logic']}")
     
-    # Generate detailed field summary
     print(f"\n📝 GENERATING DETAILED FIELD SUMMARY...")
-    field_summary = generate_field_summary(json_file)
     
     # Save detailed summary
-    summary_file = '/Users/blakelange/vibelux-app/shakapt_questionnaire_summary.json'
-    with open(summary_file, 'w', encoding='utf-8') as f:
-        json.dump({
-            'analysis': analysis,
-            'detailed_fields': field_summary
-        }, f, indent=2, ensure_ascii=False)
+    summary_file = args.output
+    write_json({
+        'analysis': analysis,
+        'detailed_fields': field_summary
+    }, summary_file, args.normalize)
     
     print(f"💾 Detailed analysis saved to: {summary_file}")
     
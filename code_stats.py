@@ -0,0 +1,835 @@
+#!/usr/bin/env python3
+"""
+Shared code statistics engine for the Vibelux line counting scripts
+Walks the tree once, fans file reads out over a process pool and merges
+per-extension and per-directory totals with a reduce step
+"""
+
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import re
+import statistics
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import reduce
+from typing import NamedTuple
+
+EXTENSIONS = ('.ts', '.tsx', '.js', '.jsx')
+EXCLUDE_DIRS = frozenset({'node_modules', '.next', 'dist', 'build', 'temp_disabled', '.git'})
+
+# Files handed to a worker per task; large enough to amortise pickling
+BATCH_SIZE = 256
+# Threads share memory, so smaller batches just spread the work more evenly
+THREAD_BATCH_SIZE = 32
+# Batches in flight per worker before the walk waits for the oldest one
+MAX_QUEUED_PER_WORKER = 4
+
+# How batches are run: 'auto' picks one of the others from a latency probe
+EXECUTORS = ('auto', 'serial', 'thread', 'process')
+DEFAULT_EXECUTOR = 'process'
+# Files opened by the probe, and the median open+read time above which
+# reads are latency-bound (network or overlay filesystems) and threads win
+PROBE_FILES = 16
+LATENCY_THRESHOLD = 0.0005
+
+# Length of the largest_files report
+TOP_N = 10
+
+CACHE_FILE = '.code_stats_cache.json'
+CACHE_VERSION = 3
+
+# Byte counting reads in fixed-size chunks and memory-maps files from this size up
+CHUNK_SIZE = 1 << 20
+MMAP_THRESHOLD = 1 << 20
+
+COUNT_MODES = ('bytes', 'text')
+DEFAULT_MODE = 'bytes'
+
+# Per-file keys added by SLOC mode
+SLOC_KEYS = ['code', 'comment', 'blank']
+
+# Per-file keys added by metrics mode, and the extensions that may contain JSX
+METRIC_KEYS = ['imports', 'exports', 'jsx']
+JSX_EXTENSIONS = ('.tsx', '.jsx')
+
+
+def count_text_lines(filepath):
+    """Count lines the way the original scripts did: decode and readlines()"""
+    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+        return len(f.readlines())
+
+
+def count_newlines(filepath):
+    """Count lines by scanning raw bytes for newlines
+
+    Nothing is decoded and no per-line objects are built; memory stays at
+    one chunk per file. A final line without a trailing newline still counts,
+    matching readlines() for LF and CRLF files.
+    """
+    with open(filepath, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return 0
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                count = 0
+                for start in range(0, size, CHUNK_SIZE):
+                    count += mm[start:start + CHUNK_SIZE].count(b'\n')
+                last = mm[size - 1]
+            return count + (last != 0x0A)
+
+        buf = bytearray(min(size, CHUNK_SIZE))
+        count = 0
+        last = 0x0A
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            count += buf.count(b'\n', 0, n)
+            last = buf[n - 1]
+        return count + (last != 0x0A)
+
+
+_COUNTERS = {'bytes': count_newlines, 'text': count_text_lines}
+
+
+def count_lines_in_file(filepath, mode=DEFAULT_MODE):
+    """Count lines in a single file, or None if it cannot be read"""
+    try:
+        return _COUNTERS[mode](filepath)
+    except OSError:
+        return None
+
+
+# Tokens that can change the lexical state of a JS/TS line
+_SPECIAL = re.compile(rb"//|/\*|['\"`]")
+_NONSPACE = re.compile(rb'\S')
+_STRINGS = {
+    ord("'"): re.compile(rb"'(?:[^'\\]|\\.)*'"),
+    ord('"'): re.compile(rb'"(?:[^"\\]|\\.)*"'),
+}
+_TEMPLATE_END = re.compile(rb'(?:[^`\\]|\\.)*`')
+# What makes backtick parity an unreliable sign that a line's templates all close
+_RESCAN = re.compile(rb'/\*|\\`|[\'"]')
+
+_CODE, _COMMENT, _BLANK = 0, 1, 2
+_NORMAL, _BLOCK, _TEMPLATE = 0, 1, 2
+
+
+def _scan_line(line, state):
+    """Classify one line starting in lexical state; returns (kind, end state)"""
+    has_code = has_comment = False
+    i, n = 0, len(line)
+    while i < n:
+        if state == _BLOCK:
+            end = line.find(b'*/', i)
+            if end < 0:
+                has_comment = has_comment or bool(_NONSPACE.search(line, i))
+                break
+            has_comment = True
+            state = _NORMAL
+            i = end + 2
+        elif state == _TEMPLATE:
+            has_code = True
+            m = _TEMPLATE_END.match(line, i)
+            if m is None:
+                break
+            state = _NORMAL
+            i = m.end()
+        else:
+            m = _SPECIAL.search(line, i)
+            end = m.start() if m else n
+            if not has_code and _NONSPACE.search(line, i, end):
+                has_code = True
+            if m is None:
+                break
+            token = m.group()
+            if token == b'//':
+                has_comment = True
+                break
+            if token == b'/*':
+                state = _BLOCK
+                has_comment = True
+                i = m.end()
+            elif token == b'`':
+                has_code = True
+                state = _TEMPLATE
+                i = m.end()
+            else:
+                has_code = True
+                string = _STRINGS[token[0]].match(line, m.start())
+                i = string.end() if string else n
+    if has_code:
+        return _CODE, state
+    return (_COMMENT if has_comment else _BLANK), state
+
+
+def classify_lines(data):
+    """Split JS/TS source bytes into (code, comment, blank) line counts
+
+    Every line is first classified from its stripped text alone: empty is
+    blank, a leading // is a comment, anything else is code. That is exact
+    unless a block comment or template literal is involved, so only lines
+    from a /*, an unbalanced or escaped backtick, or a backtick on a line
+    with quotes onwards go through the state machine in _scan_line(),
+    until the state is back to normal at a line end.
+    String literals are tracked there so // or /* inside quotes is code;
+    regex literals are not recognised.
+    """
+    lines = data.split(b'\n')
+    if lines[-1] == b'':
+        lines.pop()
+    stripped = list(map(bytes.strip, lines))
+    blank = stripped.count(b'')
+    comment = (b'\n' + b'\n'.join(stripped)).count(b'\n//')
+    counts = [len(lines) - comment - blank, comment, blank]
+
+    n_lines = len(lines)
+    line_no = pos = counted = 0
+    next_block = data.find(b'/*')
+    next_tick = data.find(b'`')
+    while line_no < n_lines:
+        if 0 <= next_block < pos:
+            next_block = data.find(b'/*', pos)
+        if 0 <= next_tick < pos:
+            next_tick = data.find(b'`', pos)
+        if next_block < 0 and next_tick < 0:
+            break
+        hit = min(p for p in (next_block, next_tick) if p >= 0)
+        line_no += data.count(b'\n', counted, hit)
+        pos = data.rfind(b'\n', 0, hit) + 1
+
+        line = lines[line_no]
+        if not line.count(b'`') % 2 and not _RESCAN.search(line):
+            # Templates open and close on this line; the quick class stands.
+            # An escaped or quoted backtick can make the count even while a
+            # template is left open, so such lines go through the state machine
+            pos += len(line) + 1
+            line_no += 1
+        else:
+            state = _NORMAL
+            while line_no < n_lines:
+                line = lines[line_no]
+                quick = _BLANK if not stripped[line_no] else \
+                    _COMMENT if stripped[line_no].startswith(b'//') else _CODE
+                kind, state = _scan_line(line, state)
+                counts[quick] -= 1
+                counts[kind] += 1
+                pos += len(line) + 1
+                line_no += 1
+                if state == _NORMAL:
+                    break
+        counted = pos
+    return tuple(counts)
+
+
+# Statements at the start of a line, and opening JSX elements or fragments.
+# A '<' right after an identifier, ')' or ']' is a generic or a comparison.
+# Every pattern starts with a literal so the engine only tries a match at each
+# '\n' or '<'; the statement patterns run on the source with a '\n' prepended,
+# and the JSX lookbehind checks the character before the '<'.
+_IMPORT = re.compile(rb'\n[ \t]*import[\s{*\'"]')
+_EXPORT = re.compile(rb'\n[ \t]*export\b')
+_JSX_OPEN = re.compile(rb'<(?<![\w$.)\]]<)(?:[A-Za-z][\w.:-]*|>)')
+
+
+def source_metrics(data, jsx=True):
+    """Import, export and JSX element counts for JS/TS source bytes
+
+    A cheap regex pass rather than a parse: static import statements,
+    export statements (including re-exports) and opening JSX elements or
+    fragments, self-closing ones included. Occurrences inside comments and
+    strings are counted too. jsx=False skips the tag scan for .ts/.js files,
+    where type assertions and generics would be mistaken for elements.
+    """
+    text = b'\n' + data
+    return {
+        'imports': len(_IMPORT.findall(text)),
+        'exports': len(_EXPORT.findall(text)),
+        'jsx': len(_JSX_OPEN.findall(data)) if jsx else 0,
+    }
+
+
+class CountOptions(NamedTuple):
+    """What the worker measures for each file"""
+    mode: str = DEFAULT_MODE
+    sloc: bool = False
+    top_n: int = TOP_N
+    digest: bool = False
+    metrics: bool = False
+
+    def required(self):
+        """Per-file keys a cached entry must hold to satisfy these options"""
+        keys = ['lines']
+        if self.sloc:
+            keys += SLOC_KEYS
+        if self.digest:
+            keys.append('digest')
+        if self.metrics:
+            keys += METRIC_KEYS
+        return keys
+
+
+def content_digest(data):
+    """Short content hash used to spot identical files across trees"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def measure_bytes(data, sloc=False):
+    """Per-file counts for content already in memory, such as a git blob"""
+    if sloc:
+        code, comment, blank = classify_lines(data) if data else (0, 0, 0)
+        return {'lines': code + comment + blank, 'code': code, 'comment': comment, 'blank': blank}
+    return {'lines': data.count(b'\n') + (data[-1:] not in (b'', b'\n'))}
+
+
+def measure_file(filepath, options):
+    """Per-file counts for the given CountOptions, or None if unreadable
+
+    SLOC, content digests and source metrics read the file once and derive
+    the physical line count from the same buffer
+    """
+    if not (options.sloc or options.digest or options.metrics):
+        lines = count_lines_in_file(filepath, options.mode)
+        return None if lines is None else {'lines': lines}
+    try:
+        with open(filepath, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    counts = measure_bytes(data, options.sloc)
+    if options.digest:
+        counts['digest'] = content_digest(data)
+    if options.metrics:
+        counts.update(source_metrics(data, filepath.endswith(JSX_EXTENSIONS)))
+    return counts
+
+
+def scan_source_files(root='.', extensions=EXTENSIONS, exclude_dirs=EXCLUDE_DIRS, ignore=None):
+    """Yield (relpath, DirEntry) for every source file outside excluded directories
+
+    Each directory is listed once with os.scandir for all extensions, and
+    excluded directory names are pruned by exact match before descending.
+    ignore is an optional code_stats_ignore.IgnoreRules: ignored directories
+    are pruned the same way and ignored files skipped. The DirEntry carries
+    cached type and stat data for the caller.
+    """
+    extensions = tuple(extensions)
+    stack = [(root, '', ignore)]
+    while stack:
+        dirpath, prefix, rules = stack.pop()
+        try:
+            with os.scandir(dirpath) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        if rules is not None:
+            rules = rules.enter(dirpath, prefix, entries)
+        subdirs = []
+        for entry in entries:
+            name = entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if name not in exclude_dirs and not (rules and rules.ignored(prefix + name, True)):
+                        subdirs.append((entry.path, prefix + name + os.sep, rules))
+                    continue
+            except OSError:
+                continue
+            if name.endswith(extensions) and not (rules and rules.ignored(prefix + name)):
+                yield prefix + name, entry
+        # Reversed so directories are visited in listing order
+        stack.extend(reversed(subdirs))
+
+
+def iter_source_files(root='.', extensions=EXTENSIONS, exclude_dirs=EXCLUDE_DIRS, ignore=None):
+    """Yield paths relative to root for every source file outside excluded directories"""
+    for relpath, _ in scan_source_files(root, extensions, exclude_dirs, ignore):
+        yield relpath
+
+
+class DirectoryTrie:
+    """Prefix tree of directory totals; each node holds its whole subtree
+
+    Built once from per-directory counts, it answers rollups for any
+    directory at any depth without touching the filesystem again
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.lines = 0
+        self.children = {}
+
+    @staticmethod
+    def _parts(dir_path):
+        dir_path = os.path.normpath(dir_path)
+        return [] if dir_path == '.' else dir_path.split(os.sep)
+
+    def add(self, dir_path, files, lines):
+        node = self
+        node.files += files
+        node.lines += lines
+        for part in self._parts(dir_path):
+            node = node.children.setdefault(part, DirectoryTrie())
+            node.files += files
+            node.lines += lines
+
+    def find(self, dir_path):
+        """Node for dir_path, or None if no counted file lives under it"""
+        node = self
+        for part in self._parts(dir_path):
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def totals(self, dir_path):
+        node = self.find(dir_path)
+        if node is None:
+            return {'files': 0, 'lines': 0}
+        return {'files': node.files, 'lines': node.lines}
+
+    def breakdown(self, depth=1, dir_path='.'):
+        """Totals for every directory exactly depth levels below dir_path"""
+        start = self.find(dir_path)
+        if start is None:
+            return {}
+        base = self._parts(dir_path)
+        level = [(base, start)]
+        for _ in range(depth):
+            level = [(parts + [name], child)
+                     for parts, node in level
+                     for name, child in node.children.items()]
+        return {os.path.join(*parts): {'files': node.files, 'lines': node.lines}
+                for parts, node in level}
+
+
+class CodeStats:
+    """Per-extension and per-directory line totals that can be merged
+
+    The largest files are kept in a min-heap bounded at top_n entries, so
+    memory stays O(top_n) however many files are counted
+    """
+
+    def __init__(self, top_n=TOP_N, sloc=False, metrics=False):
+        self.top_n = top_n
+        # Whether SLOC and metrics were requested; cached counts may carry keys the run did not ask for
+        self.count_sloc = sloc
+        self.count_metrics = metrics
+        self.total_files = 0
+        self.total_lines = 0
+        self.by_extension = {}
+        # Totals for each file's immediate parent directory; rolled up by DirectoryTrie
+        self.by_parent = {}
+        self.largest = []
+        # Code/comment/blank totals, filled only in SLOC mode
+        self.sloc = {}
+        self.sloc_by_extension = {}
+        # relpath -> (content digest, lines), filled only when digests are requested
+        self.digests = {}
+        # Import/export/JSX totals overall and per parent directory, filled only in metrics mode
+        self.metrics = {}
+        self.metrics_by_parent = {}
+
+    def add_file(self, relpath, counts):
+        """Add one file's measure_file() counts"""
+        ext = os.path.splitext(relpath)[1]
+        lines = counts['lines']
+        self.total_files += 1
+        self.total_lines += lines
+        _bump(self.by_extension, ext, lines)
+        parent = os.path.dirname(relpath) or '.'
+        if self.count_sloc:
+            _add_counts(self.sloc, counts)
+            _add_counts(self.sloc_by_extension.setdefault(ext, {}), counts)
+        if 'digest' in counts:
+            self.digests[relpath] = (counts['digest'], lines)
+        if self.count_metrics:
+            _add_counts(self.metrics, counts, METRIC_KEYS)
+            _add_counts(self.metrics_by_parent.setdefault(parent, {}), counts, METRIC_KEYS)
+        _bump(self.by_parent, parent, lines)
+        self._offer((lines, relpath, ext))
+
+    def _offer(self, item):
+        if len(self.largest) < self.top_n:
+            heapq.heappush(self.largest, item)
+        elif self.top_n and item > self.largest[0]:
+            heapq.heapreplace(self.largest, item)
+
+    def merge(self, other):
+        """Fold another CodeStats into this one and return self"""
+        self.total_files += other.total_files
+        self.total_lines += other.total_lines
+        for ext, data in other.by_extension.items():
+            _bump(self.by_extension, ext, data['lines'], data['files'])
+        for dir_path, data in other.by_parent.items():
+            _bump(self.by_parent, dir_path, data['lines'], data['files'])
+        for item in other.largest:
+            self._offer(item)
+        _add_counts(self.sloc, other.sloc)
+        for ext, data in other.sloc_by_extension.items():
+            _add_counts(self.sloc_by_extension.setdefault(ext, {}), data)
+        self.digests.update(other.digests)
+        _add_counts(self.metrics, other.metrics, METRIC_KEYS)
+        for dir_path, data in other.metrics_by_parent.items():
+            _add_counts(self.metrics_by_parent.setdefault(dir_path, {}), data, METRIC_KEYS)
+        return self
+
+    def directory_trie(self):
+        trie = DirectoryTrie()
+        for dir_path, data in self.by_parent.items():
+            trie.add(dir_path, data['files'], data['lines'])
+        return trie
+
+    @property
+    def by_directory(self):
+        """Top-level directory totals; files directly under the root go to 'root'"""
+        by_directory = {}
+        for dir_path, data in self.by_parent.items():
+            key = dir_path.partition(os.sep)[0] if dir_path != '.' else 'root'
+            _bump(by_directory, key, data['lines'], data['files'])
+        return by_directory
+
+    def metrics_by_directory(self, depth=2):
+        """Import/export/JSX totals per directory, cut at depth path components
+
+        The default depth separates src/components from src/app and so on;
+        files directly under the root go to 'root', as in by_directory
+        """
+        by_directory = {}
+        for dir_path, data in self.metrics_by_parent.items():
+            key = os.sep.join(dir_path.split(os.sep)[:depth]) if dir_path != '.' else 'root'
+            _add_counts(by_directory.setdefault(key, {}), data, METRIC_KEYS)
+        return by_directory
+
+    def largest_files(self, n=None):
+        """Up to n (default top_n) largest files, biggest first"""
+        ranked = sorted(self.largest, reverse=True)[:n]
+        return [{'path': path, 'lines': lines, 'extension': ext} for lines, path, ext in ranked]
+
+    def to_dict(self, top_n=None):
+        """Results in the code_statistics.json layout"""
+        results = {
+            'total_files': self.total_files,
+            'total_lines': self.total_lines,
+            'by_extension': self.by_extension,
+            'by_directory': self.by_directory,
+            'largest_files': self.largest_files(top_n),
+        }
+        if self.sloc:
+            results['sloc'] = {'total': self.sloc, 'by_extension': self.sloc_by_extension}
+        if self.metrics:
+            results['metrics'] = {'total': self.metrics, 'by_directory': self.metrics_by_directory()}
+        return results
+
+
+class LiveStats(CodeStats):
+    """CodeStats that also supports replacing and removing individual files
+
+    Used by watch mode: every aggregate is adjusted by the change in one
+    file's counts. The per-file map replaces the bounded heap, and the
+    largest files are picked from it when a report is built.
+    """
+
+    def __init__(self, top_n=TOP_N, sloc=False, metrics=False):
+        super().__init__(top_n, sloc, metrics)
+        self.files = {}
+
+    def set_file(self, relpath, counts):
+        self.remove_file(relpath)
+        self.files[relpath] = counts
+        self.add_file(relpath, counts)
+
+    def remove_file(self, relpath):
+        """Subtract a file's counts; returns False if it was not tracked"""
+        counts = self.files.pop(relpath, None)
+        if counts is None:
+            return False
+        ext = os.path.splitext(relpath)[1]
+        lines = counts['lines']
+        parent = os.path.dirname(relpath) or '.'
+        self.total_files -= 1
+        self.total_lines -= lines
+        for table, key in ((self.by_extension, ext), (self.by_parent, parent)):
+            _bump(table, key, -lines, -1)
+            if table[key]['files'] == 0:
+                del table[key]
+        if self.count_sloc:
+            negated = {key: -counts[key] for key in SLOC_KEYS}
+            _add_counts(self.sloc, negated)
+            _add_counts(self.sloc_by_extension[ext], negated)
+        if self.count_metrics:
+            negated = {key: -counts[key] for key in METRIC_KEYS}
+            _add_counts(self.metrics, negated, METRIC_KEYS)
+            _add_counts(self.metrics_by_parent[parent], negated, METRIC_KEYS)
+            if parent not in self.by_parent:
+                del self.metrics_by_parent[parent]
+        self.digests.pop(relpath, None)
+        return True
+
+    def _offer(self, item):
+        pass
+
+    def largest_files(self, n=None):
+        ranked = heapq.nlargest(self.top_n if n is None else n,
+                                ((counts['lines'], path, os.path.splitext(path)[1])
+                                 for path, counts in self.files.items()))
+        return [{'path': path, 'lines': lines, 'extension': ext} for lines, path, ext in ranked]
+
+
+def _bump(table, key, lines, files=1):
+    entry = table.get(key)
+    if entry is None:
+        entry = table[key] = {'files': 0, 'lines': 0}
+    entry['files'] += files
+    entry['lines'] += lines
+
+
+def _add_counts(totals, counts, keys=SLOC_KEYS):
+    for key in keys:
+        if key in counts:
+            totals[key] = totals.get(key, 0) + counts[key]
+
+
+def cache_path(mode=DEFAULT_MODE):
+    """CACHE_FILE for the default count mode, .code_stats_cache.<mode>.json for the others"""
+    if mode == DEFAULT_MODE:
+        return CACHE_FILE
+    root, ext = os.path.splitext(CACHE_FILE)
+    return f"{root}.{mode}{ext}"
+
+
+class LineCountCache:
+    """On-disk map of path -> (mtime_ns, size, inode, counts)
+
+    A file whose stat signature is unchanged reuses its stored line count,
+    so a rerun over an untouched tree is a stat-only pass
+    """
+
+    def __init__(self, path=None, mode=DEFAULT_MODE):
+        # Each count mode keeps its own file, so switching modes never discards the other's entries
+        self.path = path or cache_path(mode)
+        self.mode = mode
+        self.entries = {}
+        # True once any entry differs from what was loaded from disk
+        self.changed = False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION and data.get('mode') == mode:
+                self.entries = data['files']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    @staticmethod
+    def _signature(st):
+        return [st.st_mtime_ns, st.st_size, st.st_ino]
+
+    def lookup(self, key, st, required=('lines',)):
+        """Cached counts, cut down to the required keys, if the file is unchanged and holds them all
+
+        Entries keep whatever the richest run stored, so the extra keys are
+        dropped rather than handed to callers that did not ask for them
+        """
+        entry = self.entries.get(key)
+        if entry is not None and entry[:3] == self._signature(st):
+            counts = entry[3]
+            if all(k in counts for k in required):
+                return {k: counts[k] for k in required}
+        return None
+
+    def store(self, key, st, counts):
+        self.entries[key] = self._signature(st) + [counts]
+        self.changed = True
+
+    def prune(self, root, seen, missing_only=False):
+        """Drop entries under root that were not seen in the last walk
+
+        missing_only=True keeps unseen entries whose file still exists, for
+        walks that skip files on purpose (other extensions, ignore rules)
+        """
+        prefix = '' if os.path.normpath(root) == '.' else os.path.normpath(root) + os.sep
+        stale = [key for key in self.entries if key.startswith(prefix) and key not in seen
+                 and not (missing_only and os.path.exists(key))]
+        for key in stale:
+            del self.entries[key]
+        if stale:
+            self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        write_json_atomic(self.path, {'version': CACHE_VERSION, 'mode': self.mode, 'files': self.entries},
+                          separators=(',', ':'))
+
+
+def write_json_atomic(path, data, **dump_args):
+    """Write JSON through a temp file and rename, so readers never see a partial file"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, **dump_args)
+    os.replace(tmp_path, path)
+
+
+def _count_batch(root, relpaths, options=CountOptions()):
+    """Worker: count one batch of files into a partial CodeStats
+
+    Also returns the per-file counts so the caller can update its cache
+    """
+    stats = CodeStats(options.top_n, options.sloc, options.metrics)
+    measured = []
+    for relpath in relpaths:
+        counts = measure_file(os.path.join(root, relpath), options)
+        if counts is not None:
+            stats.add_file(relpath, counts)
+            measured.append((relpath, counts))
+    return stats, measured
+
+
+def probe_latency(root, relpaths, sample=PROBE_FILES):
+    """Median seconds to open and read one file, over files spread across relpaths"""
+    step = max(1, len(relpaths) // sample)
+    timings = []
+    for relpath in relpaths[::step][:sample]:
+        start = time.perf_counter()
+        try:
+            with open(os.path.join(root, relpath), 'rb') as f:
+                f.read()
+        except OSError:
+            continue
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) if timings else 0.0
+
+
+def choose_executor(root, relpaths, workers=None):
+    """Pick 'serial', 'thread' or 'process' for counting relpaths
+
+    Slow opens mean the counters mostly wait on I/O, which threads overlap
+    without pickling anything; otherwise the work is CPU-bound and goes to
+    processes when there is more than one CPU and more than one batch
+    """
+    if len(relpaths) <= BATCH_SIZE:
+        return 'serial'
+    if probe_latency(root, relpaths) >= LATENCY_THRESHOLD:
+        return 'thread'
+    if (workers or os.cpu_count() or 1) > 1:
+        return 'process'
+    return 'serial'
+
+
+def collect_stats(root='.', extensions=EXTENSIONS, exclude_dirs=EXCLUDE_DIRS, workers=None,
+                  cache=None, mode=DEFAULT_MODE, top_n=TOP_N, sloc=False, digest=False,
+                  metrics=False, on_file=None, executor=DEFAULT_EXECUTOR, ignore=None, prune=True):
+    """Count every source file under root and return the merged CodeStats
+
+    workers defaults to the CPU count; workers=1 counts in-process.
+    With a LineCountCache only files whose stat signature changed are read,
+    and the cache is saved afterwards. Entries under root that the walk did
+    not see are dropped; callers narrowing the walk (other extensions,
+    exclusions or ignore rules) pass prune=False so that only entries for
+    deleted files go and the default walk's entries survive. mode is 'bytes' (raw newline scan)
+    or 'text' (decode and readlines, as the original scripts did).
+    top_n bounds the largest-files heap. sloc=True also splits every file
+    into code, comment and blank lines; digest=True records a content hash
+    per file in CodeStats.digests; metrics=True counts imports, exports and
+    JSX elements per file (see source_metrics) from the same read.
+    on_file(relpath, counts) is called in this process for every counted
+    file, cached or freshly read, as soon as its batch completes.
+
+    executor is 'serial', 'thread' (for latency-bound filesystems; workers
+    defaults to the thread pool's own default), 'process' or 'auto', which
+    chooses with choose_executor() once more than one batch of files needs
+    reading. Batches go to the pool while the walk is still running, at
+    most MAX_QUEUED_PER_WORKER per worker ahead of the results. Every batch
+    fills its own partial CodeStats and the partials are merged afterwards,
+    so no pool needs locks around the totals. ignore (an IgnoreRules)
+    prunes paths matched by .gitignore-style files during the walk.
+    """
+    if mode not in COUNT_MODES:
+        raise ValueError(f"Unknown count mode {mode!r}; expected one of {COUNT_MODES}")
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor {executor!r}; expected one of {EXECUTORS}")
+    if cache is not None and cache.mode != mode:
+        raise ValueError(f"Cache holds {cache.mode!r} counts but {mode!r} was requested")
+    options = CountOptions(mode, sloc, top_n, digest, metrics)
+    required = options.required()
+    cached = CodeStats(top_n, sloc, metrics)
+    partials = []
+    signatures = {}
+    seen = set()
+    # Files still to be read, not yet handed out in a batch
+    pending = []
+    in_flight = deque()
+    batch_size = None
+    pool = None
+
+    def consume(stats, measured):
+        partials.append(stats)
+        for relpath, counts in measured:
+            if on_file is not None:
+                on_file(relpath, counts)
+            if cache is not None:
+                key, st = signatures[relpath]
+                cache.store(key, st, counts)
+
+    def dispatch(batch):
+        if pool is None:
+            consume(*_count_batch(root, batch, options))
+            return
+        in_flight.append(pool.submit(_count_batch, root, batch, options))
+        # Results are handled as they complete, so on_file sees them while the walk runs
+        while in_flight and (in_flight[0].done() or len(in_flight) > max_queued):
+            consume(*in_flight.popleft().result())
+
+    with ExitStack() as stack:
+        for relpath, entry in scan_source_files(root, extensions, exclude_dirs, ignore):
+            if cache is not None:
+                key = os.path.normpath(os.path.join(root, relpath))
+                seen.add(key)
+                try:
+                    st = entry.stat(follow_symlinks=True)
+                except OSError:
+                    continue
+                counts = cache.lookup(key, st, required)
+                if counts is not None:
+                    cached.add_file(relpath, counts)
+                    if on_file is not None:
+                        on_file(relpath, counts)
+                    continue
+                signatures[relpath] = (key, st)
+            pending.append(relpath)
+
+            if batch_size is None:
+                # One batch or less is always read in-process; beyond that, pick the executor
+                if len(pending) <= BATCH_SIZE:
+                    continue
+                if executor == 'auto':
+                    executor = choose_executor(root, pending, workers)
+                if executor == 'thread':
+                    batch_size = THREAD_BATCH_SIZE
+                    pool_class = ThreadPoolExecutor
+                else:
+                    workers = workers or os.cpu_count() or 1
+                    batch_size = BATCH_SIZE
+                    pool_class = ProcessPoolExecutor
+                if executor != 'serial' and workers != 1:
+                    pool = stack.enter_context(pool_class(max_workers=workers))
+                    max_queued = MAX_QUEUED_PER_WORKER * (workers or os.cpu_count() or 1)
+            while len(pending) >= batch_size:
+                dispatch(pending[:batch_size])
+                del pending[:batch_size]
+
+        if pending:
+            dispatch(pending)
+        while in_flight:
+            consume(*in_flight.popleft().result())
+
+    if cache is not None:
+        cache.prune(root, seen, missing_only=not prune)
+        cache.save()
+
+    return reduce(CodeStats.merge, partials, cached)
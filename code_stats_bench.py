@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the line counting strategies
+Builds synthetic source trees shaped like the Vibelux .tsx files (or uses a
+real tree) and times each strategy in a fresh interpreter, reporting wall
+time, peak RSS and files per second. Results can be saved and compared
+against a baseline to catch regressions.
+"""
+
+import argparse
+import json
+import mmap
+import os
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from code_stats import BATCH_SIZE, CHUNK_SIZE, collect_stats, count_newlines, count_text_lines, iter_source_files
+
+# Quantiles (fraction, value) measured on the .tsx files under src/
+LINES_PER_FILE = [(0.0, 1), (0.1, 15), (0.25, 159), (0.5, 393), (0.75, 598), (0.9, 822),
+                  (0.95, 999), (0.99, 1408), (1.0, 3000)]
+LINE_LENGTH = [(0.0, 1), (0.1, 7), (0.25, 18), (0.5, 29), (0.75, 58), (0.9, 81),
+               (0.95, 95), (0.99, 129), (1.0, 400)]
+BLANK_LINE_RATE = 0.045
+
+SYNTHETIC_EXTENSIONS = ('.tsx', '.tsx', '.tsx', '.ts', '.ts', '.js')
+RESULTS_FILE = 'code_stats_bench.json'
+
+# A strategy counts this much slower than the baseline before it is a regression
+REGRESSION_THRESHOLD = 0.20
+
+
+def _sample(rng, quantiles):
+    """Draw from a distribution given as piecewise-linear quantiles"""
+    u = rng.random()
+    for (p0, v0), (p1, v1) in zip(quantiles, quantiles[1:]):
+        if u <= p1:
+            return round(v0 + (v1 - v0) * (u - p0) / (p1 - p0))
+    return quantiles[-1][1]
+
+
+def _synthetic_file(rng):
+    lines = []
+    for _ in range(_sample(rng, LINES_PER_FILE)):
+        if rng.random() < BLANK_LINE_RATE:
+            lines.append('')
+            continue
+        length = _sample(rng, LINE_LENGTH)
+        indent = min(length - 1, 2 * rng.randrange(8))
+        lines.append(' ' * indent + 'x' * (length - indent))
+    return '\n'.join(lines) + '\n'
+
+
+def build_synthetic_tree(path, files=2000, depth=4, fanout=6, seed=0):
+    """Write files source files spread over directories up to depth levels deep"""
+    rng = random.Random(seed)
+    dirs = ['']
+    frontier = ['']
+    for level in range(depth):
+        frontier = [os.path.join(parent, f"d{level}_{i}") for parent in frontier for i in range(fanout)]
+        dirs.extend(frontier)
+        if len(dirs) >= files:
+            break
+    for d in dirs:
+        os.makedirs(os.path.join(path, d), exist_ok=True)
+    for i in range(files):
+        name = f"file{i}{rng.choice(SYNTHETIC_EXTENSIONS)}"
+        with open(os.path.join(path, rng.choice(dirs), name), 'w', encoding='utf-8') as f:
+            f.write(_synthetic_file(rng))
+    return path
+
+
+def _mmap_lines(filepath):
+    """Like count_newlines, but memory-maps every file whatever its size"""
+    with open(filepath, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            count = sum(mm[start:start + CHUNK_SIZE].count(b'\n')
+                        for start in range(0, size, CHUNK_SIZE))
+            last = mm[size - 1]
+    return count + (last != 0x0A)
+
+
+def _serial(counter):
+    def run(root, workers):
+        paths = [os.path.join(root, p) for p in iter_source_files(root)]
+        return len(paths), sum(map(counter, paths))
+    return run
+
+
+def _threads(root, workers):
+    paths = [os.path.join(root, p) for p in iter_source_files(root)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return len(paths), sum(pool.map(count_newlines, paths, chunksize=64))
+
+
+def _processes(root, workers):
+    paths = [os.path.join(root, p) for p in iter_source_files(root)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return len(paths), sum(pool.map(count_newlines, paths, chunksize=BATCH_SIZE))
+
+
+def _engine(executor):
+    """collect_stats() as the counting scripts call it, aggregation included"""
+    def run(root, workers):
+        stats = collect_stats(root, workers=workers, executor=executor)
+        return stats.total_files, stats.total_lines
+    return run
+
+
+STRATEGIES = {
+    'readlines': _serial(count_text_lines),
+    'bytes': _serial(count_newlines),
+    'mmap': _serial(_mmap_lines),
+    'threads': _threads,
+    'processes': _processes,
+    'engine': _engine('process'),
+    'engine-thread': _engine('thread'),
+    'engine-auto': _engine('auto'),
+}
+
+
+def _peak_rss_kib():
+    """Peak RSS of this process plus that of its largest child, in KiB"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if sys.platform == 'darwin':
+        own, children = own // 1024, children // 1024
+    return own + children
+
+
+def run_strategy(strategy, root, workers):
+    """Time one strategy in a fresh interpreter so peak RSS is its own"""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', strategy, root, str(workers)],
+        check=True, stdout=subprocess.PIPE, cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stdout
+    return json.loads(output)
+
+
+def _child(strategy, root, workers):
+    start = time.perf_counter()
+    files, lines = STRATEGIES[strategy](root, workers)
+    wall = time.perf_counter() - start
+    print(json.dumps({'files': files, 'lines': lines, 'wall': wall, 'peak_rss_kib': _peak_rss_kib()}))
+
+
+def benchmark(trees, strategies, workers, repeat):
+    """{tree: {strategy: result}} with the median wall time over repeat runs"""
+    results = {}
+    for label, root in trees:
+        results[label] = {}
+        for strategy in strategies:
+            runs = [run_strategy(strategy, root, workers) for _ in range(repeat)]
+            wall = statistics.median(r['wall'] for r in runs)
+            results[label][strategy] = {
+                'files': runs[0]['files'],
+                'lines': runs[0]['lines'],
+                'wall': wall,
+                'files_per_sec': runs[0]['files'] / wall if wall else 0.0,
+                'peak_rss_kib': max(r['peak_rss_kib'] for r in runs),
+            }
+    return results
+
+
+def regressions(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """(tree, strategy, old wall, new wall) for runs slower than baseline by more than threshold"""
+    slower = []
+    for label, strategies in results.items():
+        for strategy, result in strategies.items():
+            old = baseline.get(label, {}).get(strategy)
+            if old and result['wall'] > old['wall'] * (1 + threshold):
+                slower.append((label, strategy, old['wall'], result['wall']))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the line counting strategies")
+    parser.add_argument('--files', type=int, default=2000, help="files in the synthetic tree")
+    parser.add_argument('--depth', type=int, default=4, help="directory depth of the synthetic tree")
+    parser.add_argument('--fanout', type=int, default=6, help="subdirectories per synthetic directory")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--real', metavar='DIR', action='append', default=[],
+                        help="also benchmark a real tree (repeatable), e.g. --real src")
+    parser.add_argument('--no-synthetic', action='store_true', help="only benchmark --real trees")
+    parser.add_argument('--strategy', action='append', choices=sorted(STRATEGIES),
+                        help="strategies to run (default: all)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="pool size for the thread and process strategies")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per strategy; the median is kept")
+    parser.add_argument('--json', metavar='FILE', nargs='?', const=RESULTS_FILE,
+                        help=f"save results (default: {RESULTS_FILE})")
+    parser.add_argument('--compare', metavar='FILE', help="fail if slower than these saved results")
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        strategy, root, workers = args.child
+        _child(strategy, root, int(workers))
+        return
+
+    strategies = args.strategy or list(STRATEGIES)
+    trees = [(f"real:{path}", os.path.abspath(path)) for path in args.real]
+    tmpdir = None
+    try:
+        if not args.no_synthetic:
+            tmpdir = tempfile.mkdtemp(prefix='code_stats_bench_')
+            build_synthetic_tree(tmpdir, args.files, args.depth, args.fanout, args.seed)
+            trees.insert(0, (f"synthetic:{args.files}x{args.depth}", tmpdir))
+        results = benchmark(trees, strategies, args.workers, args.repeat)
+    finally:
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    print("LINE COUNTING BENCHMARK")
+    print("=" * 75)
+    print(f"Workers: {args.workers} | Runs per strategy: {args.repeat} (median wall time)")
+    for label, strategies_run in results.items():
+        first = next(iter(strategies_run.values()))
+        print(f"\n\n{label} ({first['files']:,} files, {first['lines']:,} lines):")
+        print("-" * 75)
+        for strategy, r in sorted(strategies_run.items(), key=lambda x: x[1]['wall']):
+            print(f"{strategy:13} | {r['wall']:8.3f}s | {r['files_per_sec']:10,.0f} files/s | "
+                  f"peak RSS {r['peak_rss_kib'] / 1024:7.1f} MiB")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n\nResults saved to {args.json}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        slower = regressions(results, baseline)
+        for label, strategy, old, new in slower:
+            print(f"REGRESSION {label} {strategy}: {old:.3f}s -> {new:.3f}s")
+        if slower:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Command line interface to the code statistics engine
+Emits machine-readable records instead of banner tables: JSON Lines and CSV
+stream one record per file as its batch is counted, followed by the
+per-extension, per-directory and overall totals; Prometheus text carries
+the totals as gauges
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from code_stats import (COUNT_MODES, DEFAULT_MODE, EXCLUDE_DIRS, EXECUTORS, EXTENSIONS, METRIC_KEYS,
+                        SLOC_KEYS, LineCountCache, collect_stats)
+from code_stats_ignore import IGNORE_FILES, IgnoreRules
+
+FORMATS = ('jsonl', 'csv', 'prometheus')
+
+# Prefix for every Prometheus metric name
+METRIC_PREFIX = 'vibelux_code'
+
+
+class JsonLinesWriter:
+    """One JSON object per line, flushed as it is written"""
+
+    def __init__(self, stream, fields):
+        self.stream = stream
+
+    def record(self, record):
+        self.stream.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self.stream.flush()
+
+    def close(self, elapsed):
+        pass
+
+
+class CsvWriter:
+    """One CSV row per record under a fixed header, flushed as it is written"""
+
+    def __init__(self, stream, fields):
+        self.stream = stream
+        self.writer = csv.DictWriter(stream, fields, extrasaction='ignore', lineterminator='\n')
+        self.writer.writeheader()
+
+    def record(self, record):
+        self.writer.writerow(record)
+        self.stream.flush()
+
+    def close(self, elapsed):
+        pass
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class PrometheusWriter:
+    """Prometheus text exposition of the totals
+
+    Per-file records are not exported (a series per file would swamp any
+    scraper), so everything is written once the walk completes
+    """
+
+    def __init__(self, stream, fields):
+        self.stream = stream
+        self.families = {}
+
+    def record(self, record):
+        kind = record['kind']
+        if kind == 'file':
+            return
+        labels = {'extension': {'extension': record['name']},
+                  'directory': {'directory': record['name']},
+                  'total': {}}[kind]
+        for key, value in record.items():
+            if key in ('kind', 'name') or value is None:
+                continue
+            name = f"{METRIC_PREFIX}_{key}" if kind == 'total' else f"{METRIC_PREFIX}_{kind}_{key}"
+            self.families.setdefault(name, []).append((labels, value))
+
+    def close(self, elapsed):
+        self.families[f"{METRIC_PREFIX}_scan_duration_seconds"] = [({}, round(elapsed, 6))]
+        lines = []
+        for name, samples in self.families.items():
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{_label(v)}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        self.stream.write('\n'.join(lines) + '\n')
+        self.stream.flush()
+
+
+WRITERS = {'jsonl': JsonLinesWriter, 'csv': CsvWriter, 'prometheus': PrometheusWriter}
+
+
+def _fields(sloc, metrics):
+    fields = ['kind', 'name', 'files', 'lines']
+    if sloc:
+        fields += SLOC_KEYS
+    if metrics:
+        fields += METRIC_KEYS
+    return fields
+
+
+def summary_records(stats):
+    """Per-extension, per-directory and overall records for a finished CodeStats"""
+    for ext, data in sorted(stats.by_extension.items()):
+        record = {'kind': 'extension', 'name': ext, **data}
+        record.update(stats.sloc_by_extension.get(ext, {}))
+        yield record
+    metrics = stats.metrics_by_directory(1) if stats.metrics else {}
+    for dir_name, data in sorted(stats.by_directory.items()):
+        yield {'kind': 'directory', 'name': dir_name, **data, **metrics.get(dir_name, {})}
+    yield {'kind': 'total', 'name': '', 'files': stats.total_files, 'lines': stats.total_lines,
+           **stats.sloc, **stats.metrics}
+
+
+def _extensions(values):
+    extensions = []
+    for value in values:
+        for ext in value.split(','):
+            ext = ext.strip()
+            if ext:
+                extensions.append(ext if ext.startswith('.') else '.' + ext)
+    return tuple(dict.fromkeys(extensions))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Count source lines and emit JSON Lines, CSV or Prometheus text")
+    parser.add_argument('root', nargs='?', default='.', help="directory to count (default: .)")
+    parser.add_argument('-f', '--format', choices=FORMATS, default='jsonl',
+                        help="output format (default: %(default)s)")
+    parser.add_argument('-o', '--output', metavar='FILE', help="write to FILE instead of stdout")
+    parser.add_argument('--ext', action='append', metavar='EXT',
+                        help=f"extensions to count, repeatable or comma separated "
+                             f"(default: {','.join(EXTENSIONS)})")
+    parser.add_argument('--exclude', action='append', default=[], metavar='DIR',
+                        help="directory name to skip, in addition to the defaults (repeatable)")
+    parser.add_argument('--no-default-excludes', action='store_true',
+                        help=f"do not skip {', '.join(sorted(EXCLUDE_DIRS))}")
+    parser.add_argument('--respect-ignore', action='store_true',
+                        help=f"skip paths matched by {', '.join(IGNORE_FILES)} under root")
+    parser.add_argument('--sloc', action='store_true', help="add code, comment and blank lines")
+    parser.add_argument('--metrics', action='store_true', help="add import, export and JSX counts")
+    parser.add_argument('--mode', choices=COUNT_MODES, default=DEFAULT_MODE,
+                        help="how physical lines are counted (default: %(default)s)")
+    parser.add_argument('--no-cache', action='store_true', help="ignore the line count cache")
+    parser.add_argument('--executor', choices=EXECUTORS, default='auto',
+                        help="how files are read (default: %(default)s)")
+    parser.add_argument('--workers', type=int, help="threads or processes to use")
+    args = parser.parse_args(argv)
+
+    extensions = _extensions(args.ext) if args.ext else EXTENSIONS
+    exclude_dirs = frozenset(args.exclude) | (frozenset() if args.no_default_excludes else EXCLUDE_DIRS)
+    cache = None if args.no_cache else LineCountCache(mode=args.mode)
+    ignore = IgnoreRules.load(args.root) if args.respect_ignore else None
+    # The cache is shared with the other scripts; a narrowed walk must not prune their entries
+    prune = set(extensions) == set(EXTENSIONS) and exclude_dirs == EXCLUDE_DIRS and ignore is None
+
+    stream = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    try:
+        fields = _fields(args.sloc, args.metrics)
+        writer = WRITERS[args.format](stream, fields)
+
+        def emit(record):
+            # Cached entries may hold keys from other runs (SLOC, digests); keep the requested ones
+            writer.record({key: value for key, value in record.items() if key in fields})
+
+        def on_file(relpath, counts):
+            emit({'kind': 'file', 'name': relpath.replace(os.sep, '/'), 'files': 1, **counts})
+
+        start = time.perf_counter()
+        stats = collect_stats(args.root, extensions, exclude_dirs, workers=args.workers, cache=cache,
+                              mode=args.mode, sloc=args.sloc, metrics=args.metrics,
+                              on_file=on_file, executor=args.executor, ignore=ignore, prune=prune)
+        for record in summary_records(stats):
+            emit(record)
+        writer.close(time.perf_counter() - start)
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); stop quietly like other filters
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        raise SystemExit(1)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Duplicate code report for the Vibelux tree
+Finds files that are byte-for-byte copies (src vs the src-backup-* trees)
+from content digests computed in the counting workers, and optionally
+duplicated runs of lines from rolling line-window hashes (cached by
+content digest, so unchanged files and their copies are hashed once)
+"""
+
+import argparse
+import base64
+import json
+import os
+import zlib
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from code_stats import (BATCH_SIZE, LineCountCache, collect_stats, content_digest, iter_source_files,
+                        write_json_atomic)
+
+# Consecutive non-blank lines that must match to count as duplicated
+DEFAULT_WINDOW = 6
+
+WINDOW_CACHE_FILE = '.code_stats_windows.json'
+WINDOW_CACHE_VERSION = 1
+
+_MOD = (1 << 61) - 1
+_BASE = 1_000_003
+
+
+def _tree(relpath):
+    head, sep, _ = relpath.partition(os.sep)
+    return head if sep else 'root'
+
+
+def find_duplicates(stats, groups=10):
+    """Whole-file duplication report from a CodeStats collected with digest=True
+
+    A tree (top-level directory) is fully redundant when every one of its
+    files also exists, byte for byte, in some other tree
+    """
+    by_digest = {}
+    for relpath, (digest, lines) in stats.digests.items():
+        by_digest.setdefault(digest, []).append(relpath)
+
+    total_lines = sum(lines for _, lines in stats.digests.values())
+    unique_lines = 0
+    duplicate_files = 0
+    trees = {}
+    duplicate_groups = []
+
+    for digest, paths in by_digest.items():
+        lines = stats.digests[paths[0]][1]
+        unique_lines += lines
+        duplicate_files += len(paths) - 1
+        owners = {_tree(path) for path in paths}
+        for path in paths:
+            tree = trees.setdefault(_tree(path), {'files': 0, 'lines': 0,
+                                                  'shared_files': 0, 'shared_lines': 0})
+            tree['files'] += 1
+            tree['lines'] += lines
+            if len(owners) > 1:
+                tree['shared_files'] += 1
+                tree['shared_lines'] += lines
+        if len(paths) > 1:
+            duplicate_groups.append({'digest': digest, 'lines': lines,
+                                     'copies': len(paths), 'paths': sorted(paths)})
+
+    for tree in trees.values():
+        tree['redundant'] = tree['files'] > 0 and tree['shared_files'] == tree['files']
+
+    duplicate_groups.sort(key=lambda g: g['lines'] * (g['copies'] - 1), reverse=True)
+    return {
+        'files': len(stats.digests),
+        'unique_files': len(by_digest),
+        'duplicate_files': duplicate_files,
+        'lines': total_lines,
+        'unique_lines': unique_lines,
+        'duplicated_lines': total_lines - unique_lines,
+        'trees': trees,
+        'largest_groups': duplicate_groups[:groups],
+    }
+
+
+class WindowHashCache:
+    """On-disk map of content digest -> (non-blank lines, window hashes) for one window size
+
+    Keyed by the same digests the line count cache stores, so a file whose
+    content is unchanged, or that copies another file, is never rehashed.
+    Hashes are kept as base64 of 64-bit unsigned integers.
+    """
+
+    def __init__(self, path=WINDOW_CACHE_FILE, window=DEFAULT_WINDOW):
+        self.path = path
+        self.window = window
+        self.entries = {}
+        self.changed = False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == WINDOW_CACHE_VERSION and data.get('window') == window:
+                self.entries = data['digests']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def lookup(self, digest):
+        """(non-blank lines, hashes) for content with this digest, or None"""
+        entry = self.entries.get(digest)
+        if entry is None:
+            return None
+        hashes = array('Q')
+        hashes.frombytes(base64.b64decode(entry[1]))
+        return entry[0], hashes
+
+    def store(self, digest, lines, hashes):
+        self.entries[digest] = [lines, base64.b64encode(array('Q', hashes).tobytes()).decode('ascii')]
+        self.changed = True
+
+    def prune(self, seen):
+        """Drop entries for content no longer in the tree"""
+        stale = [digest for digest in self.entries if digest not in seen]
+        for digest in stale:
+            del self.entries[digest]
+        if stale:
+            self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        write_json_atomic(self.path, {'version': WINDOW_CACHE_VERSION, 'window': self.window,
+                                      'digests': self.entries}, separators=(',', ':'))
+
+
+def line_window_hashes(data, window=DEFAULT_WINDOW):
+    """(non-blank line count, rolling hash of every window of that many lines) for file content
+
+    Lines are compared with surrounding whitespace stripped, so re-indented
+    copies still match
+    """
+    lines = [line for line in map(bytes.strip, data.split(b'\n')) if line]
+    n = len(lines)
+    if n < window:
+        return n, []
+    line_hashes = list(map(zlib.crc32, lines))
+    power = pow(_BASE, window - 1, _MOD)
+    h = 0
+    for value in line_hashes[:window]:
+        h = (h * _BASE + value) % _MOD
+    hashes = [h]
+    for i in range(window, n):
+        h = ((h - line_hashes[i - window] * power) * _BASE + line_hashes[i]) % _MOD
+        hashes.append(h)
+    return n, hashes
+
+
+def window_hashes(filepath, window=DEFAULT_WINDOW):
+    """line_window_hashes() for one file"""
+    with open(filepath, 'rb') as f:
+        return line_window_hashes(f.read(), window)
+
+
+def _window_batch(root, relpaths, window):
+    """Worker: (relpath, digest of what was read, non-blank lines, hashes) per file"""
+    results = []
+    for relpath in relpaths:
+        try:
+            with open(os.path.join(root, relpath), 'rb') as f:
+                data = f.read()
+        except OSError:
+            continue
+        results.append((relpath, content_digest(data), *line_window_hashes(data, window)))
+    return results
+
+
+def find_duplicate_lines(root='.', relpaths=None, window=DEFAULT_WINDOW, workers=None,
+                         digests=None, cache=None):
+    """Line-level duplication from rolling windows of non-blank lines
+
+    A line is duplicated when some window covering it occurs more than once
+    anywhere in the tree; hashing is spread over a process pool. digests
+    ({relpath: (digest, lines)}, as in CodeStats.digests) lets identical
+    files be hashed once, and with a WindowHashCache for the same window
+    unchanged content is not read at all.
+    """
+    if relpaths is None:
+        relpaths = list(iter_source_files(root))
+    if cache is not None and cache.window != window:
+        raise ValueError(f"Cache holds {cache.window}-line windows but {window} was requested")
+    digests = digests or {}
+    # digest -> (non-blank lines, hashes); None until its first path has been read
+    known = {}
+    to_read = []
+    for relpath in relpaths:
+        digest = digests.get(relpath, (None,))[0]
+        if digest is not None and digest not in known and cache is not None:
+            hit = cache.lookup(digest)
+            if hit is not None:
+                known[digest] = hit
+        if digest is None or digest not in known:
+            # Only the first path of each uncached content is read; copies reuse its hashes
+            to_read.append(relpath)
+            if digest is not None:
+                known[digest] = None
+
+    batches = [to_read[i:i + BATCH_SIZE] for i in range(0, len(to_read), BATCH_SIZE)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(batches) <= 1:
+        results = [_window_batch(root, batch, window) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_window_batch, [root] * len(batches), batches,
+                                    [window] * len(batches)))
+    read = {}
+    for batch in results:
+        for relpath, digest, n, hashes in batch:
+            read[relpath] = (n, hashes)
+            if cache is not None:
+                cache.store(digest, n, hashes)
+            if digests.get(relpath, (None,))[0] == digest:
+                known[digest] = (n, hashes)
+
+    # (relpath, content key); copies share a key, so each content is counted up once
+    files = []
+    contents = {}
+    for relpath in relpaths:
+        digest = digests.get(relpath, (None,))[0]
+        if relpath in read:
+            key = relpath
+            contents[key] = read[relpath]
+        elif known.get(digest) is not None:
+            key = digest
+            contents[key] = known[digest]
+        else:
+            continue
+        files.append((relpath, key))
+
+    if cache is not None:
+        if digests:
+            cache.prune({digest for digest, _ in digests.values()})
+        cache.save()
+
+    copies = Counter(key for _, key in files)
+    occurrences = Counter()
+    for key, (_, hashes) in contents.items():
+        for _ in range(copies[key]):
+            occurrences.update(hashes)
+
+    duplicated_by_key = {}
+    for key, (n, hashes) in contents.items():
+        covered = bytearray(n)
+        for i, h in enumerate(hashes):
+            if occurrences[h] > 1:
+                covered[i:i + window] = b'\x01' * window
+        duplicated_by_key[key] = covered.count(1)
+
+    trees = {}
+    for relpath, key in files:
+        tree = trees.setdefault(_tree(relpath), {'lines': 0, 'duplicated_lines': 0})
+        tree['lines'] += contents[key][0]
+        tree['duplicated_lines'] += duplicated_by_key[key]
+
+    lines = sum(t['lines'] for t in trees.values())
+    duplicated = sum(t['duplicated_lines'] for t in trees.values())
+    return {'window': window, 'lines': lines, 'duplicated_lines': duplicated,
+            'unique_lines': lines - duplicated, 'trees': trees}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report duplicated code across the Vibelux trees")
+    parser.add_argument('--window', type=int, default=0, metavar='N',
+                        help=f"also match runs of N non-blank lines (e.g. {DEFAULT_WINDOW})")
+    parser.add_argument('--json', metavar='FILE', help="write the full report to FILE")
+    args = parser.parse_args()
+
+    # Digests share the line count cache, so unchanged files are not rehashed
+    cache = LineCountCache()
+    stats = collect_stats('.', cache=cache, digest=True)
+    report = {'files': find_duplicates(stats)}
+    files = report['files']
+
+    print("DUPLICATE CODE REPORT")
+    print("=" * 60)
+    print(f"\nFiles: {files['files']:,} ({files['duplicate_files']:,} exact copies)")
+    print(f"Lines: {files['lines']:,} | Unique: {files['unique_lines']:,} | "
+          f"Duplicated: {files['duplicated_lines']:,}")
+
+    print("\n\nBY TREE (files also present in another tree):")
+    print("-" * 60)
+    for tree, data in sorted(files['trees'].items(), key=lambda x: x[1]['lines'], reverse=True):
+        flag = "  FULLY REDUNDANT" if data['redundant'] else ""
+        print(f"{tree:28} | Shared: {data['shared_files']:5,}/{data['files']:5,} files{flag}")
+
+    if args.window:
+        # Window hashes are cached by content digest, so only new content is hashed
+        report['lines'] = find_duplicate_lines('.', sorted(stats.digests), args.window,
+                                               digests=stats.digests,
+                                               cache=WindowHashCache(window=args.window))
+        lines = report['lines']
+        print(f"\n\nLINE WINDOWS ({args.window} lines):")
+        print("-" * 60)
+        print(f"Non-blank lines: {lines['lines']:,} | Duplicated: {lines['duplicated_lines']:,}")
+        for tree, data in sorted(lines['trees'].items(), key=lambda x: x[1]['lines'], reverse=True):
+            print(f"{tree:28} | Lines: {data['lines']:10,} | Duplicated: {data['duplicated_lines']:10,}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n\nFull report saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Git-aware code statistics
+Enumerates tracked files from the index (or any commit) and counts lines by
+streaming blobs through one persistent `git cat-file --batch` process
+"""
+
+import os
+import subprocess
+import threading
+
+from code_stats import (EXCLUDE_DIRS, EXTENSIONS, JSX_EXTENSIONS, TOP_N, CodeStats, measure_bytes,
+                        source_metrics)
+
+# Tree entry modes that are not regular file content
+_SKIP_MODES = {b'120000', b'160000'}
+
+
+class GitBlobReader:
+    """One long-lived `git cat-file --batch` process for reading blobs"""
+
+    def __init__(self, repo='.'):
+        self.proc = subprocess.Popen(
+            ['git', '-C', repo, 'cat-file', '--batch'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        )
+
+    def _read_response(self):
+        header = self.proc.stdout.readline()
+        if not header:
+            raise RuntimeError("git cat-file exited unexpectedly")
+        parts = header.split()
+        if len(parts) != 3:
+            # "<object> missing" or "<object> ambiguous"
+            return None
+        size = int(parts[2])
+        data = self.proc.stdout.read(size)
+        self.proc.stdout.read(1)  # trailing newline after the content
+        return data
+
+    def read(self, sha):
+        """Content of one object, or None if it does not exist"""
+        self.proc.stdin.write(sha.encode() + b'\n')
+        self.proc.stdin.flush()
+        return self._read_response()
+
+    def read_many(self, shas):
+        """Yield (sha, content) in order, pipelining requests from a writer thread
+
+        Keeping requests queued ahead of the reader means git never waits on
+        a round trip between blobs
+        """
+        shas = list(shas)
+
+        def feed():
+            for sha in shas:
+                self.proc.stdin.write(sha.encode() + b'\n')
+            self.proc.stdin.flush()
+
+        writer = threading.Thread(target=feed, daemon=True)
+        writer.start()
+        for sha in shas:
+            yield sha, self._read_response()
+        writer.join()
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.proc.stdin.close()
+            self.proc.wait()
+            self.proc.stdout.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _git(repo, *args):
+    return subprocess.run(['git', '-C', repo, *args], check=True,
+                          stdout=subprocess.PIPE).stdout
+
+
+def tracked_files(repo='.', rev=None):
+    """Yield (path, blob sha) for tracked files in the index, or in the tree at rev"""
+    if rev is None:
+        # <mode> <sha> <stage>\t<path>; conflicted paths keep only stage 0 or "ours"
+        output = _git(repo, 'ls-files', '--stage', '-z')
+        seen = set()
+        for record in output.split(b'\0'):
+            if not record:
+                continue
+            meta, _, path = record.partition(b'\t')
+            mode, sha, stage = meta.split()
+            if mode in _SKIP_MODES or stage not in (b'0', b'2') or path in seen:
+                continue
+            seen.add(path)
+            yield os.fsdecode(path), sha.decode()
+    else:
+        # <mode> <type> <sha>\t<path>
+        output = _git(repo, 'ls-tree', '-r', '-z', '--full-tree', rev)
+        for record in output.split(b'\0'):
+            if not record:
+                continue
+            meta, _, path = record.partition(b'\t')
+            mode, kind, sha = meta.split()
+            if kind != b'blob' or mode in _SKIP_MODES:
+                continue
+            yield os.fsdecode(path), sha.decode()
+
+
+def select_files(entries, extensions=EXTENSIONS, exclude_dirs=EXCLUDE_DIRS):
+    """Keep source files whose path has no excluded directory component"""
+    extensions = tuple(extensions)
+    for path, sha in entries:
+        if not path.endswith(extensions):
+            continue
+        if any(part in exclude_dirs for part in path.split('/')[:-1]):
+            continue
+        yield path.replace('/', os.sep), sha
+
+
+def collect_git_stats(repo='.', rev=None, extensions=EXTENSIONS, exclude_dirs=EXCLUDE_DIRS,
+                      top_n=TOP_N, sloc=False, on_file=None, metrics=False):
+    """Count tracked source files straight from the object database
+
+    rev=None counts what is staged in the index; any commit-ish counts that
+    tree. Identical blobs (copies across the backup trees) are read once.
+    metrics=True adds import, export and JSX element counts per file.
+    on_file(relpath, counts) is called for every counted file.
+    """
+    files = list(select_files(tracked_files(repo, rev), extensions, exclude_dirs))
+    unique = list(dict.fromkeys(sha for _, sha in files))
+
+    measured = {}
+    with GitBlobReader(repo) as reader:
+        for sha, data in reader.read_many(unique):
+            if data is not None:
+                measured[sha] = counts = measure_bytes(data, sloc)
+                if metrics:
+                    counts.update(source_metrics(data))
+
+    stats = CodeStats(top_n, sloc, metrics)
+    for path, sha in files:
+        counts = measured.get(sha)
+        if counts is not None:
+            if metrics and not path.endswith(JSX_EXTENSIONS):
+                # Blobs are shared across paths; JSX is only counted in .tsx/.jsx
+                counts = dict(counts, jsx=0)
+            stats.add_file(path, counts)
+            if on_file is not None:
+                on_file(path, counts)
+    return stats
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Code growth over the repository history
+Walks first-parent history once, applying each commit's diff to running
+per-extension and per-directory totals instead of recounting the tree, and
+stores the series in a compact columnar JSON file
+"""
+
+import argparse
+import json
+import os
+import subprocess
+
+from code_stats import EXCLUDE_DIRS, EXTENSIONS, measure_bytes
+from code_stats_git import GitBlobReader
+
+HISTORY_FILE = 'code_history.json'
+
+_NULL_SHA = '0' * 40
+_SKIP_MODES = {'120000', '160000'}
+
+
+def _split_nul(stream, chunk_size=1 << 16):
+    """Yield NUL-terminated records from a binary stream without reading it all"""
+    pending = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        pending += chunk
+        records = pending.split(b'\0')
+        pending = records.pop()
+        yield from records
+    if pending:
+        yield pending
+
+
+def iter_commit_diffs(repo='.', rev='HEAD'):
+    """Yield (sha, timestamp, changes) oldest first along the first-parent chain
+
+    changes is a list of (path, old_sha, new_sha) with the null sha for an
+    added or deleted side; merges are diffed against their first parent
+    """
+    proc = subprocess.Popen(
+        ['git', '-C', repo, 'log', '--reverse', '--first-parent',
+         '--diff-merges=first-parent', '--raw', '-z', '--no-renames', '--no-abbrev',
+         '--format=%x01%H %ct', rev],
+        stdout=subprocess.PIPE,
+    )
+    commit = None
+    records = _split_nul(proc.stdout)
+    for record in records:
+        record = record.lstrip(b'\n')
+        if record.startswith(b'\x01'):
+            if commit is not None:
+                yield commit
+            sha, timestamp = record[1:].decode().split()
+            commit = (sha, int(timestamp), [])
+        elif record.startswith(b':'):
+            old_mode, new_mode, old_sha, new_sha, _status = record[1:].decode().split()
+            path = os.fsdecode(next(records))
+            if old_mode in _SKIP_MODES:
+                old_sha = _NULL_SHA
+            if new_mode in _SKIP_MODES:
+                new_sha = _NULL_SHA
+            commit[2].append((path, old_sha, new_sha))
+    if commit is not None:
+        yield commit
+    proc.stdout.close()
+    if proc.wait() != 0:
+        raise subprocess.CalledProcessError(proc.returncode, proc.args)
+
+
+def _bucket(path, extensions, exclude_dirs):
+    """(extension, top-level directory) for a counted path, or None"""
+    if not path.endswith(extensions):
+        return None
+    parts = path.split('/')
+    if any(part in exclude_dirs for part in parts[:-1]):
+        return None
+    return os.path.splitext(path)[1], parts[0] if len(parts) > 1 else 'root'
+
+
+def collect_history(repo='.', rev='HEAD', extensions=EXTENSIONS, exclude_dirs=EXCLUDE_DIRS):
+    """Per-commit totals as columns: one list per metric, one entry per commit
+
+    Only blobs a commit adds or modifies are read, and each distinct blob
+    once for the whole history
+    """
+    extensions = tuple(extensions)
+    tracked = {}       # path -> (ext, dir, lines)
+    blob_lines = {}    # blob sha -> line count
+    ext_lines = {}
+    dir_lines = {}
+    total_files = total_lines = 0
+
+    columns = {'commit': [], 'timestamp': [], 'total_files': [], 'total_lines': []}
+    ext_series = {}
+    dir_series = {}
+
+    def adjust(table, key, delta):
+        table[key] = table.get(key, 0) + delta
+
+    with GitBlobReader(repo) as reader:
+        for index, (sha, timestamp, changes) in enumerate(iter_commit_diffs(repo, rev)):
+            relevant = []
+            for path, _, new_sha in changes:
+                bucket = _bucket(path, extensions, exclude_dirs)
+                if bucket is not None:
+                    relevant.append((path, bucket, new_sha))
+
+            wanted = {new for _, _, new in relevant if new != _NULL_SHA and new not in blob_lines}
+            for blob, data in reader.read_many(wanted):
+                blob_lines[blob] = measure_bytes(data)['lines'] if data is not None else 0
+
+            for path, (ext, dir_key), new_sha in relevant:
+                previous = tracked.pop(path, None)
+                if previous is not None:
+                    total_files -= 1
+                    total_lines -= previous[2]
+                    adjust(ext_lines, previous[0], -previous[2])
+                    adjust(dir_lines, previous[1], -previous[2])
+                if new_sha != _NULL_SHA:
+                    lines = blob_lines[new_sha]
+                    tracked[path] = (ext, dir_key, lines)
+                    total_files += 1
+                    total_lines += lines
+                    adjust(ext_lines, ext, lines)
+                    adjust(dir_lines, dir_key, lines)
+
+            columns['commit'].append(sha)
+            columns['timestamp'].append(timestamp)
+            columns['total_files'].append(total_files)
+            columns['total_lines'].append(total_lines)
+            for table, series in ((ext_lines, ext_series), (dir_lines, dir_series)):
+                # Keys never leave the running tables; late arrivals are back-filled with zeros
+                for key, lines in table.items():
+                    series.setdefault(key, [0] * index).append(lines)
+
+    return {
+        'commits': len(columns['commit']),
+        'columns': columns,
+        'by_extension': ext_series,
+        'by_directory': dir_series,
+    }
+
+
+def save_history(history, path=HISTORY_FILE):
+    """Write the columnar series as compact JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, separators=(',', ':'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-commit code growth for the Vibelux repository")
+    parser.add_argument('rev', nargs='?', default='HEAD', help="history to walk (default: HEAD)")
+    parser.add_argument('-o', '--output', default=HISTORY_FILE, help="columnar output file")
+    args = parser.parse_args()
+
+    try:
+        history = collect_history('.', args.rev)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        parser.error(f"cannot read git revision {args.rev!r}")
+    save_history(history, args.output)
+
+    columns = history['columns']
+    print(f"Commits: {history['commits']:,}")
+    if history['commits']:
+        print(f"Lines at first commit: {columns['total_lines'][0]:,}")
+        print(f"Lines at {args.rev}: {columns['total_lines'][-1]:,}")
+        for dir_name, series in sorted(history['by_directory'].items(),
+                                       key=lambda x: x[1][-1], reverse=True)[:10]:
+            print(f"  {dir_name:30} {series[0]:10,} -> {series[-1]:10,}")
+    print(f"Time series saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Ignore-file support for the code walker
+Compiles .gitignore, .vercelignore and .dockerignore patterns into one
+regex per file so the walker can prune ignored directories before it
+descends into them
+"""
+
+import os
+import re
+
+IGNORE_FILES = ('.gitignore', '.vercelignore', '.dockerignore')
+
+# Docker anchors every pattern at the build context root; git and Vercel
+# match slash-free patterns at any depth
+_ANCHORED_FILES = frozenset({'.dockerignore'})
+
+
+def _character_class(pattern, i):
+    """(regex, next index) for a [...] class starting at pattern[i], or None if unterminated"""
+    j = i + 1
+    if j < len(pattern) and pattern[j] in '!^':
+        j += 1
+    if j < len(pattern) and pattern[j] == ']':
+        j += 1
+    j = pattern.find(']', j)
+    if j < 0:
+        return None
+    body = pattern[i + 1:j].replace('\\', '\\\\')
+    if body[:1] in ('!', '^'):
+        body = '^' + body[1:]
+    return f'[{body}]', j + 1
+
+
+def translate(pattern, anchored=False):
+    """Regex (for fullmatch against a '/'-separated relative path) for one pattern
+
+    pattern has already lost any leading '!' and trailing '/'. A pattern
+    with a slash before its end is relative to the ignore file's directory;
+    otherwise it matches a name at any depth unless anchored is set.
+    """
+    if pattern.startswith('/'):
+        anchored = True
+        pattern = pattern[1:]
+    elif '/' in pattern:
+        anchored = True
+
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i) and (i == 0 or pattern[i - 1] == '/'):
+                if i + 2 == n:
+                    out.append('.*')
+                    i += 2
+                    continue
+                if pattern[i + 2] == '/':
+                    out.append('(?:.*/)?')
+                    i += 3
+                    continue
+            while i < n and pattern[i] == '*':
+                i += 1
+            out.append('[^/]*')
+            continue
+        if c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            cls = _character_class(pattern, i)
+            if cls is not None:
+                out.append(cls[0])
+                i = cls[1]
+                continue
+            out.append(re.escape(c))
+        elif c == '\\' and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        else:
+            out.append(re.escape(c))
+        i += 1
+
+    body = ''.join(out)
+    return body if anchored else '(?:.*/)?' + body
+
+
+def _parse(lines):
+    """Yield (pattern, negated, dir_only) for every rule in ignore-file lines"""
+    for line in lines:
+        line = line.rstrip('\r\n')
+        while line.endswith(' ') and not line.endswith('\\ '):
+            line = line[:-1]
+        if not line or line.startswith('#'):
+            continue
+        negated = line.startswith('!')
+        if negated:
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if line:
+            yield line, negated, dir_only
+
+
+class IgnoreFile:
+    """The rules of one ignore file, precompiled
+
+    All rules are folded into a single alternation, last rule first, so
+    one fullmatch finds the rule that decides a path (later rules win, as
+    in git). Directory-only rules get a second regex that files skip.
+    """
+
+    def __init__(self, lines, anchored=False):
+        rules = list(_parse(lines))
+        self.negated = [negated for _, negated, _ in rules]
+        self.any_path = self._compile(rules, anchored, dirs=True)
+        self.files_only = self._compile(rules, anchored, dirs=False)
+
+    @staticmethod
+    def _compile(rules, anchored, dirs):
+        alternatives = [f'(?P<r{i}>{translate(pattern, anchored)})'
+                        for i, (pattern, _, dir_only) in enumerate(rules)
+                        if dirs or not dir_only]
+        if not alternatives:
+            return None
+        return re.compile('|'.join(reversed(alternatives)), re.S)
+
+    @classmethod
+    def load(cls, path, anchored=False):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return cls(f, anchored)
+
+    def match(self, relpath, is_dir):
+        """True if ignored, False if re-included by a '!' rule, None if no rule applies"""
+        regex = self.any_path if is_dir else self.files_only
+        if regex is None:
+            return None
+        m = regex.fullmatch(relpath)
+        if m is None:
+            return None
+        return not self.negated[int(m.lastgroup[1:])]
+
+
+class IgnoreRules:
+    """Ignore files in effect for one directory of the walk
+
+    Holds (name, prefix, IgnoreFile) triples from the walk root down. Each
+    kind of ignore file is read on its own terms and a path is ignored if
+    any of them ignores it, so a '!' rule only re-includes paths within its
+    own file's set. Among .gitignore files the deepest with an opinion
+    decides, as in git; only those are picked up below the root, since
+    Vercel and Docker read theirs from the root alone.
+    """
+
+    def __init__(self, files=()):
+        self.files = tuple(files)
+
+    @classmethod
+    def load(cls, root='.', names=IGNORE_FILES):
+        files = []
+        for name in names:
+            path = os.path.join(root, name)
+            if os.path.isfile(path):
+                files.append((name, '', IgnoreFile.load(path, anchored=name in _ANCHORED_FILES)))
+        return cls(files)
+
+    def enter(self, dirpath, prefix, entries):
+        """Rules for the directory at dirpath, given its scandir entries"""
+        if not prefix or not any(entry.name == '.gitignore' for entry in entries):
+            return self
+        try:
+            nested = IgnoreFile.load(os.path.join(dirpath, '.gitignore'))
+        except OSError:
+            return self
+        return IgnoreRules(self.files + (('.gitignore', prefix.replace(os.sep, '/'), nested),))
+
+    def ignored(self, relpath, is_dir=False):
+        """Whether relpath (relative to the walk root) is ignored by any of the ignore files"""
+        if os.sep != '/':
+            relpath = relpath.replace(os.sep, '/')
+        # Kinds of ignore file whose deepest opinion re-included relpath
+        included = set()
+        for name, prefix, rules in reversed(self.files):
+            if name in included or not relpath.startswith(prefix):
+                continue
+            decision = rules.match(relpath[len(prefix):], is_dir)
+            if decision:
+                return True
+            if decision is not None:
+                included.add(name)
+        return False
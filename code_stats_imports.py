@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Import graph for the Vibelux sources
+Parses import specifiers from every .ts/.tsx file under src/ over a process
+pool (cached per file by stat signature), resolves relative and tsconfig
+`@/` aliased paths to modules, and reports fan-in, fan-out, import cycles
+and the size of each module's transitive closure
+"""
+
+import argparse
+import json
+import os
+import posixpath
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from code_stats import BATCH_SIZE, EXCLUDE_DIRS, LineCountCache, scan_source_files, write_json_atomic
+
+GRAPH_EXTENSIONS = ('.ts', '.tsx')
+IMPORT_CACHE_FILE = '.code_stats_imports.json'
+
+# Extensions and index files tried, in order, when resolving a specifier
+RESOLVE_EXTENSIONS = ('.ts', '.tsx', '.d.ts', '.js', '.jsx')
+
+# Used when tsconfig.json is missing or cannot be parsed
+DEFAULT_PATHS = {'@/*': ['./src/*']}
+
+# `... from '...'` (imports and re-exports), bare `import '...'` and `import('...')`
+_SPECIFIER = re.compile(
+    rb'''(?:\bfrom\s*|^[ \t]*import\s*|\bimport\s*\(\s*)(['"])([^'"\n]+)\1''', re.M)
+
+
+def parse_specifiers(data):
+    """Module specifiers imported or re-exported by one file, in order, without repeats"""
+    return list(dict.fromkeys(m.group(2).decode('utf-8', 'replace')
+                              for m in _SPECIFIER.finditer(data)))
+
+
+def _parse_batch(root, relpaths):
+    """Worker: (relpath, specifiers) for one batch of files"""
+    parsed = []
+    for relpath in relpaths:
+        try:
+            with open(os.path.join(root, relpath), 'rb') as f:
+                parsed.append((relpath, parse_specifiers(f.read())))
+        except OSError:
+            pass
+    return parsed
+
+
+def load_path_aliases(project='.'):
+    """(baseUrl, paths) from tsconfig.json, falling back to the src/ alias"""
+    try:
+        with open(os.path.join(project, 'tsconfig.json'), 'r', encoding='utf-8') as f:
+            options = json.load(f).get('compilerOptions', {})
+    except (OSError, ValueError):
+        return '.', DEFAULT_PATHS
+    return options.get('baseUrl', '.'), options.get('paths') or DEFAULT_PATHS
+
+
+class ModuleResolver:
+    """Maps specifiers to module ids (posix paths relative to the project)
+
+    Only modules in the graph resolve; anything else is either an external
+    package (a bare specifier) or unresolved (a relative or aliased path to
+    a file outside the graph, such as a stylesheet or a missing module)
+    """
+
+    def __init__(self, modules, base_url='.', paths=None):
+        self.modules = set(modules)
+        self.base_url = posixpath.normpath(base_url)
+        # Longest prefix wins, as in TypeScript
+        patterns = []
+        for pattern, targets in (paths or {}).items():
+            prefix, star, suffix = pattern.partition('*')
+            patterns.append((prefix, suffix if star else None, targets))
+        self.patterns = sorted(patterns, key=lambda p: len(p[0]), reverse=True)
+
+    def _module(self, base):
+        if base in self.modules:
+            return base
+        for ext in RESOLVE_EXTENSIONS:
+            if base + ext in self.modules:
+                return base + ext
+        for ext in RESOLVE_EXTENSIONS:
+            candidate = posixpath.join(base, 'index' + ext)
+            if candidate in self.modules:
+                return candidate
+        return None
+
+    def _join(self, path):
+        return posixpath.normpath(posixpath.join(self.base_url, path))
+
+    def resolve(self, importer, specifier):
+        """(kind, target): ('module', id), ('external', package) or ('unresolved', specifier)"""
+        if specifier.startswith('.'):
+            base = posixpath.normpath(posixpath.join(posixpath.dirname(importer), specifier))
+            module = self._module(base)
+            return ('module', module) if module else ('unresolved', specifier)
+
+        for prefix, suffix, targets in self.patterns:
+            if suffix is None:
+                if specifier != prefix:
+                    continue
+                rest = ''
+            elif specifier.startswith(prefix) and specifier.endswith(suffix) \
+                    and len(specifier) >= len(prefix) + len(suffix):
+                rest = specifier[len(prefix):len(specifier) - len(suffix)]
+            else:
+                continue
+            for target in targets:
+                module = self._module(self._join(target.replace('*', rest, 1)))
+                if module:
+                    return 'module', module
+            return 'unresolved', specifier
+
+        # Non-relative paths are also looked up from baseUrl before treating them as packages
+        module = self._module(self._join(specifier))
+        if module:
+            return 'module', module
+        parts = specifier.split('/')
+        package = '/'.join(parts[:2]) if specifier.startswith('@') else parts[0]
+        return 'external', package
+
+
+def strongly_connected(graph):
+    """Tarjan's algorithm, iteratively; components come out sinks first"""
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+    for start in graph:
+        if start in index:
+            continue
+        work = [(start, iter(graph[start]))]
+        index[start] = low[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack.add(start)
+        while work:
+            node, edges = work[-1]
+            for target in edges:
+                if target not in index:
+                    index[target] = low[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack.add(target)
+                    work.append((target, iter(graph[target])))
+                    break
+                if target in on_stack:
+                    low[node] = min(low[node], index[target])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def closure_sizes(graph, components):
+    """Number of other modules each module reaches through its imports
+
+    Reachability is accumulated per component as an int bitset, visiting
+    components sinks first so every successor is already complete
+    """
+    bit = {node: 1 << i for i, node in enumerate(graph)}
+    component_of = {}
+    reach = []
+    for c, component in enumerate(components):
+        for node in component:
+            component_of[node] = c
+        bits = 0
+        for node in component:
+            bits |= bit[node]
+            for target in graph[node]:
+                if component_of[target] != c:
+                    bits |= reach[component_of[target]]
+        reach.append(bits)
+    return {node: reach[component_of[node]].bit_count() - 1 for node in graph}
+
+
+def build_import_graph(project='.', root='src', extensions=GRAPH_EXTENSIONS, exclude_dirs=EXCLUDE_DIRS,
+                       workers=None, cache=None):
+    """Parse every file under project/root into a module graph and analyse it
+
+    Returns {'modules': {id: {...}}, 'cycles': [[id, ...], ...], 'external': {package: modules},
+    'unresolved': count}. With a LineCountCache only files whose stat
+    signature changed are re-parsed.
+    """
+    scan_root = os.path.join(project, root)
+    prefix = posixpath.normpath(os.path.relpath(scan_root, project).replace(os.sep, '/'))
+    found = list(scan_source_files(scan_root, extensions, exclude_dirs))
+    specifiers = {}
+    signatures = {}
+    misses = []
+
+    for relpath, entry in found:
+        if cache is not None:
+            key = os.path.normpath(os.path.join(scan_root, relpath))
+            try:
+                st = entry.stat(follow_symlinks=True)
+            except OSError:
+                continue
+            counts = cache.lookup(key, st, ('specifiers',))
+            if counts is not None:
+                specifiers[relpath] = counts['specifiers']
+                continue
+            signatures[relpath] = (key, st)
+        misses.append(relpath)
+
+    workers = workers or os.cpu_count() or 1
+    batches = [misses[i:i + BATCH_SIZE] for i in range(0, len(misses), BATCH_SIZE)]
+    if workers == 1 or len(batches) <= 1:
+        results = [_parse_batch(scan_root, batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_parse_batch, [scan_root] * len(batches), batches))
+    for parsed in results:
+        for relpath, specs in parsed:
+            specifiers[relpath] = specs
+            if cache is not None:
+                key, st = signatures[relpath]
+                cache.store(key, st, {'specifiers': specs})
+    if cache is not None:
+        cache.prune(scan_root, {os.path.normpath(os.path.join(scan_root, p)) for p, _ in found})
+        cache.save()
+
+    module_ids = {relpath: posixpath.join(prefix, relpath.replace(os.sep, '/')) if prefix != '.'
+                  else relpath.replace(os.sep, '/') for relpath in specifiers}
+    base_url, paths = load_path_aliases(project)
+    resolver = ModuleResolver(module_ids.values(), base_url, paths)
+
+    graph = {}
+    external = {}
+    unresolved = 0
+    for relpath in sorted(specifiers, key=module_ids.get):
+        module = module_ids[relpath]
+        targets = []
+        for spec in specifiers[relpath]:
+            kind, target = resolver.resolve(module, spec)
+            if kind == 'module':
+                if target not in targets:
+                    targets.append(target)
+            elif kind == 'external':
+                external[target] = external.get(target, 0) + 1
+            else:
+                unresolved += 1
+        graph[module] = targets
+
+    fan_in = dict.fromkeys(graph, 0)
+    for targets in graph.values():
+        for target in targets:
+            fan_in[target] += 1
+    components = strongly_connected(graph)
+    closure = closure_sizes(graph, components)
+    cycles = [sorted(c) for c in components if len(c) > 1 or c[0] in graph[c[0]]]
+    cycles.sort(key=len, reverse=True)
+
+    modules = {module: {'fan_in': fan_in[module], 'fan_out': len(targets),
+                        'closure': closure[module], 'imports': targets}
+               for module, targets in graph.items()}
+    return {'modules': modules, 'cycles': cycles, 'external': external, 'unresolved': unresolved}
+
+
+def _ranked(modules, key, top):
+    return sorted(modules.items(), key=lambda x: (-x[1][key], x[0]))[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import graph and fan-in/fan-out report for src/")
+    parser.add_argument('root', nargs='?', default='src', help="directory to graph (default: src)")
+    parser.add_argument('--top', type=int, default=15, help="modules listed per ranking")
+    parser.add_argument('--json', metavar='FILE', help="write the full graph and metrics to FILE")
+    args = parser.parse_args()
+
+    # Specifiers are cached per file, so only edited files are re-parsed
+    cache = LineCountCache(IMPORT_CACHE_FILE, mode='imports')
+    graph = build_import_graph('.', args.root, cache=cache)
+    modules = graph['modules']
+    edges = sum(m['fan_out'] for m in modules.values())
+
+    print("IMPORT GRAPH")
+    print("=" * 60)
+    print(f"\nModules: {len(modules):,} | Internal imports: {edges:,} | "
+          f"External packages: {len(graph['external']):,} | Unresolved: {graph['unresolved']:,}")
+
+    for title, key in (("MOST IMPORTED (FAN-IN)", 'fan_in'), ("MOST IMPORTS (FAN-OUT)", 'fan_out'),
+                       ("LARGEST TRANSITIVE CLOSURE", 'closure')):
+        print(f"\n\n{title}:")
+        print("-" * 60)
+        for module, data in _ranked(modules, key, args.top):
+            print(f"{data[key]:6,} | {module}")
+
+    cycles = graph['cycles']
+    print(f"\n\nIMPORT CYCLES: {len(cycles):,} "
+          f"({sum(len(c) for c in cycles):,} modules)")
+    print("-" * 60)
+    for cycle in cycles[:args.top]:
+        print(f"{len(cycle):4} modules | {', '.join(cycle[:4])}{', ...' if len(cycle) > 4 else ''}")
+
+    if args.json:
+        write_json_atomic(args.json, graph, indent=2)
+        print(f"\n\nFull graph saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
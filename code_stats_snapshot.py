@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Compact per-file snapshots of the code statistics
+Every counted file goes into a little-endian columnar file: interned
+directory paths, an extension enum and uint32 line counts. Snapshots are
+memory-mapped on load, and two of them diff with a merge-join over their
+sorted columns instead of building a dict per file
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b'VXCS'
+VERSION = 1
+SNAPSHOT_FILE = 'code_statistics.snap'
+
+# magic, version, flags, files, dirs, extensions, then the offset of each section
+_HEADER = struct.Struct('<4sHHIII' + 'Q' * 9)
+_SECTIONS = ('dir_offsets', 'dir_blob', 'ext_offsets', 'ext_blob', 'name_offsets', 'name_blob',
+             'file_dir', 'file_ext', 'file_lines')
+_ALIGN = 8
+
+
+def _u32(values):
+    column = array('I', values)
+    if column.itemsize != 4:
+        raise RuntimeError("array('I') is not 32-bit on this platform")
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column.tobytes()
+
+
+def _string_table(strings):
+    offsets = [0]
+    blob = bytearray()
+    for s in strings:
+        blob += s.encode('utf-8')
+        offsets.append(len(blob))
+    return _u32(offsets), bytes(blob)
+
+
+def write_snapshot(path, files):
+    """Write (relpath, lines) pairs as a snapshot; returns the file count
+
+    Records are sorted by (directory, name) so snapshots can be merge-joined
+    """
+    records = []
+    for relpath, lines in files:
+        parts = relpath.replace(os.sep, '/').rpartition('/')
+        records.append((parts[0], parts[2], lines))
+    records.sort()
+    if len(records) > 0xFFFFFFFF:
+        raise ValueError("too many files for a uint32 snapshot")
+
+    dirs = sorted({d for d, _, _ in records})
+    dir_index = {d: i for i, d in enumerate(dirs)}
+    exts = sorted({os.path.splitext(name)[1] for _, name, _ in records})
+    if len(exts) > 256:
+        raise ValueError("more than 256 distinct extensions")
+    ext_index = {e: i for i, e in enumerate(exts)}
+
+    dir_offsets, dir_blob = _string_table(dirs)
+    ext_offsets, ext_blob = _string_table(exts)
+    name_offsets, name_blob = _string_table(name for _, name, _ in records)
+    sections = {
+        'dir_offsets': dir_offsets,
+        'dir_blob': dir_blob,
+        'ext_offsets': ext_offsets,
+        'ext_blob': ext_blob,
+        'name_offsets': name_offsets,
+        'name_blob': name_blob,
+        'file_dir': _u32(dir_index[d] for d, _, _ in records),
+        'file_ext': bytes(ext_index[os.path.splitext(name)[1]] for _, name, _ in records),
+        'file_lines': _u32(min(lines, 0xFFFFFFFF) for _, _, lines in records),
+    }
+
+    offsets = []
+    position = _HEADER.size
+    for name in _SECTIONS:
+        position += -position % _ALIGN
+        offsets.append(position)
+        position += len(sections[name])
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, 0, len(records), len(dirs), len(exts), *offsets))
+        for name, offset in zip(_SECTIONS, offsets):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(sections[name])
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot file
+
+    Columns are exposed as memoryviews over the mapping, so opening a
+    snapshot costs the same whatever the number of files
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = view = memoryview(self._mmap)
+        magic, version, _flags, files, dirs, exts, *offsets = _HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} code statistics snapshot")
+        self.files = files
+        at = dict(zip(_SECTIONS, offsets))
+
+        self.dir_offsets = self._column(view, at['dir_offsets'], dirs + 1)
+        self.ext_offsets = self._column(view, at['ext_offsets'], exts + 1)
+        self.name_offsets = self._column(view, at['name_offsets'], files + 1)
+        self.dir_blob = view[at['dir_blob']:at['dir_blob'] + self.dir_offsets[-1]]
+        self.ext_blob = view[at['ext_blob']:at['ext_blob'] + self.ext_offsets[-1]]
+        self.name_blob = view[at['name_blob']:at['name_blob'] + self.name_offsets[-1]]
+        self.file_dir = self._column(view, at['file_dir'], files)
+        self.file_ext = view[at['file_ext']:at['file_ext'] + files]
+        self.file_lines = self._column(view, at['file_lines'], files)
+
+        # Directory and extension tables are small; decode them once
+        self.dirs = [self._string(self.dir_blob, self.dir_offsets, i) for i in range(dirs)]
+        self.extensions = [self._string(self.ext_blob, self.ext_offsets, i) for i in range(exts)]
+
+    @staticmethod
+    def _column(view, offset, count):
+        raw = view[offset:offset + 4 * count]
+        if sys.byteorder == 'little':
+            return raw.cast('I')
+        column = array('I', raw)
+        column.byteswap()
+        return column
+
+    @staticmethod
+    def _string(blob, offsets, i):
+        return bytes(blob[offsets[i]:offsets[i + 1]]).decode('utf-8')
+
+    def __len__(self):
+        return self.files
+
+    def name_bytes(self, i):
+        return bytes(self.name_blob[self.name_offsets[i]:self.name_offsets[i + 1]])
+
+    def path(self, i):
+        directory = self.dirs[self.file_dir[i]]
+        name = self.name_bytes(i).decode('utf-8')
+        return f"{directory}/{name}" if directory else name
+
+    def extension(self, i):
+        return self.extensions[self.file_ext[i]]
+
+    def lines(self, i):
+        return self.file_lines[i]
+
+    def total_lines(self):
+        return sum(self.file_lines)
+
+    def by_extension(self):
+        """Per-extension totals computed straight from the columns"""
+        files = [0] * len(self.extensions)
+        lines = [0] * len(self.extensions)
+        for ext, count in zip(self.file_ext, self.file_lines):
+            files[ext] += 1
+            lines[ext] += count
+        return {ext: {'files': files[i], 'lines': lines[i]}
+                for i, ext in enumerate(self.extensions) if files[i]}
+
+    def close(self):
+        for column in (self.dir_offsets, self.ext_offsets, self.name_offsets, self.dir_blob,
+                       self.ext_blob, self.name_blob, self.file_dir, self.file_ext, self.file_lines):
+            if isinstance(column, memoryview):
+                column.release()
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def diff_snapshots(old, new):
+    """Yield (path, old_lines, new_lines) for every added, removed or changed file
+
+    A side is None when the file is absent from it. Both snapshots are
+    walked in their stored order; directories are compared by their rank in
+    the union of the two directory tables, so only the directory tables
+    are ever turned into Python objects
+    """
+    union = sorted(set(old.dirs) | set(new.dirs))
+    rank = {d: i for i, d in enumerate(union)}
+    old_rank = [rank[d] for d in old.dirs]
+    new_rank = [rank[d] for d in new.dirs]
+
+    i = j = 0
+    while i < len(old) or j < len(new):
+        if j >= len(new):
+            order = -1
+        elif i >= len(old):
+            order = 1
+        else:
+            a = (old_rank[old.file_dir[i]], old.name_bytes(i))
+            b = (new_rank[new.file_dir[j]], new.name_bytes(j))
+            order = -1 if a < b else 1 if a > b else 0
+        if order < 0:
+            yield old.path(i), old.lines(i), None
+            i += 1
+        elif order > 0:
+            yield new.path(j), None, new.lines(j)
+            j += 1
+        else:
+            if old.lines(i) != new.lines(j):
+                yield old.path(i), old.lines(i), new.lines(j)
+            i += 1
+            j += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or diff code statistics snapshots")
+    parser.add_argument('old', help="snapshot file")
+    parser.add_argument('new', nargs='?', help="second snapshot to diff against the first")
+    args = parser.parse_args()
+
+    if args.new is None:
+        with Snapshot(args.old) as snap:
+            print(f"Files: {len(snap):,} | Lines: {snap.total_lines():,} | Directories: {len(snap.dirs):,}")
+            for ext, data in sorted(snap.by_extension().items()):
+                print(f"{ext:5} files: {data['files']:6,} | Lines: {data['lines']:10,}")
+        return
+
+    added = removed = changed = delta = 0
+    with Snapshot(args.old) as old, Snapshot(args.new) as new:
+        for path, before, after in diff_snapshots(old, new):
+            delta += (after or 0) - (before or 0)
+            if before is None:
+                added += 1
+                print(f"+ {after:6,} | {path}")
+            elif after is None:
+                removed += 1
+                print(f"- {before:6,} | {path}")
+            else:
+                changed += 1
+                print(f"~ {after - before:+6,} | {path}")
+    print(f"\n{added:,} added, {removed:,} removed, {changed:,} changed, {delta:+,} lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Live code statistics
+Takes one snapshot of the tree, then follows filesystem changes (inotify on
+Linux, polling elsewhere) and keeps code_statistics.json current by
+adjusting the aggregates for each changed file instead of recounting
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+from code_stats import (DEFAULT_EXECUTOR, EXCLUDE_DIRS, EXTENSIONS, TOP_N, CountOptions, LineCountCache,
+                        LiveStats, collect_stats, iter_source_files, measure_file, scan_source_files,
+                        write_json_atomic)
+
+OUTPUT_FILE = 'code_statistics.json'
+
+# Changes arriving this close together are applied as one update
+DEBOUNCE = 0.2
+POLL_INTERVAL = 2.0
+
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_DONT_FOLLOW = 0x02000000
+_IN_ISDIR = 0x40000000
+
+_WATCH_MASK = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE
+               | _IN_DELETE | _IN_ONLYDIR | _IN_DONT_FOLLOW)
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Watches every non-excluded directory under root through inotify (via ctypes)"""
+
+    def __init__(self, root='.', extensions=EXTENSIONS, exclude_dirs=EXCLUDE_DIRS):
+        self.root = root
+        self.extensions = tuple(extensions)
+        self.exclude_dirs = exclude_dirs
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}  # watch descriptor -> directory relative to root ('' for root)
+        try:
+            self.add_tree('')
+        except OSError:
+            self.close()
+            raise
+
+    def add_tree(self, reldir):
+        """Watch reldir and every non-excluded directory below it"""
+        stack = [reldir]
+        while stack:
+            current = stack.pop()
+            path = os.path.join(self.root, current) if current else self.root
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                if current == reldir or errno == 28:  # ENOSPC: out of watches
+                    raise OSError(errno, f"inotify_add_watch failed for {path}")
+                continue
+            self.dirs[wd] = current
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False) and entry.name not in self.exclude_dirs:
+                            stack.append(os.path.join(current, entry.name))
+            except OSError:
+                pass
+
+    def _forget_tree(self, reldir):
+        prefix = reldir + os.sep
+        for wd, current in list(self.dirs.items()):
+            if current == reldir or current.startswith(prefix):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.dirs[wd]
+
+    def _read(self):
+        try:
+            buf = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(buf):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(buf[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            yield wd, mask, name
+
+    def changes(self):
+        """Block until something changes; returns (files, dirs) to resync
+
+        files are relpaths to re-measure or drop; dirs are subtrees whose
+        contents must be rescanned (created, removed or moved directories,
+        or the whole tree after an event queue overflow)
+        """
+        files, dirs = set(), set()
+        deadline = None
+        while True:
+            wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([self.fd], [], [], wait)
+            if not ready:
+                return files, dirs
+            for wd, mask, name in self._read():
+                if mask & _IN_Q_OVERFLOW:
+                    dirs.add('')
+                    continue
+                if mask & _IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    continue
+                parent = self.dirs.get(wd)
+                if parent is None:
+                    continue
+                relpath = os.path.join(parent, name) if parent else name
+                if mask & _IN_ISDIR:
+                    if name in self.exclude_dirs:
+                        continue
+                    if mask & (_IN_MOVED_FROM | _IN_DELETE):
+                        self._forget_tree(relpath)
+                    elif mask & (_IN_CREATE | _IN_MOVED_TO):
+                        self.add_tree(relpath)
+                    dirs.add(relpath)
+                elif name.endswith(self.extensions):
+                    files.add(relpath)
+            if deadline is None and (files or dirs):
+                deadline = time.monotonic() + DEBOUNCE
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    """Fallback that rescans stat data on an interval and diffs the signatures"""
+
+    def __init__(self, root='.', extensions=EXTENSIONS, exclude_dirs=EXCLUDE_DIRS,
+                 interval=POLL_INTERVAL):
+        self.root = root
+        self.extensions = extensions
+        self.exclude_dirs = exclude_dirs
+        self.interval = interval
+        self.signatures = self._scan()
+
+    def _scan(self):
+        signatures = {}
+        for relpath, entry in scan_source_files(self.root, self.extensions, self.exclude_dirs):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            signatures[relpath] = (st.st_mtime_ns, st.st_size, st.st_ino)
+        return signatures
+
+    def changes(self):
+        """Block until a rescan differs; returns (files, dirs) like InotifyWatcher"""
+        while True:
+            time.sleep(self.interval)
+            current = self._scan()
+            previous, self.signatures = self.signatures, current
+            changed = {path for path in current.keys() | previous.keys()
+                       if current.get(path) != previous.get(path)}
+            if changed:
+                return changed, set()
+
+    def close(self):
+        pass
+
+
+def open_watcher(root='.', extensions=EXTENSIONS, exclude_dirs=EXCLUDE_DIRS,
+                 interval=POLL_INTERVAL, polling=False):
+    """inotify where available, otherwise (or when asked) the polling fallback"""
+    if not polling:
+        try:
+            return InotifyWatcher(root, extensions, exclude_dirs)
+        except (OSError, AttributeError, TypeError):
+            # Not Linux, no libc symbol, or out of watches
+            pass
+    return PollingWatcher(root, extensions, exclude_dirs, interval)
+
+
+def apply_changes(live, root, files, dirs, options, extensions=EXTENSIONS,
+                  exclude_dirs=EXCLUDE_DIRS):
+    """Re-measure changed files and resync changed subtrees; returns files touched"""
+    files = set(files)
+    for reldir in dirs:
+        prefix = reldir + os.sep if reldir else ''
+        files.update(path for path in live.files if path.startswith(prefix))
+        path = os.path.join(root, reldir) if reldir else root
+        if os.path.isdir(path):
+            files.update(os.path.join(reldir, p) if reldir else p
+                         for p in iter_source_files(path, extensions, exclude_dirs))
+
+    for relpath in files:
+        counts = measure_file(os.path.join(root, relpath), options)
+        if counts is None:
+            live.remove_file(relpath)
+        else:
+            live.set_file(relpath, counts)
+    return len(files)
+
+
+def _results(live):
+    """Results in the code_statistics.json layout, with the source every one-shot run records"""
+    results = live.to_dict()
+    results['source'] = {'kind': 'working_tree', 'respect_ignore': False}
+    return results
+
+
+def watch(root='.', output=OUTPUT_FILE, top_n=TOP_N, sloc=False, interval=POLL_INTERVAL,
+          polling=False, on_update=None, metrics=False, executor=DEFAULT_EXECUTOR, workers=None):
+    """Snapshot root, then keep output current until interrupted
+
+    The watcher is opened before the snapshot is taken, so edits made
+    while the tree is being counted are queued (or show up in the first
+    poll) and applied straight afterwards. executor and workers apply to
+    that snapshot, as in collect_stats(); changes are re-measured in-process.
+    on_update(live, touched) is called after every rewrite of output
+    """
+    options = CountOptions(sloc=sloc, top_n=top_n, metrics=metrics)
+    live = LiveStats(top_n, sloc, metrics)
+    required = options.required()
+
+    def snapshot_file(relpath, counts):
+        # Keep the per-file map to what later measure_file() calls produce for these options
+        live.set_file(relpath, {key: counts[key] for key in required})
+
+    watcher = open_watcher(root, interval=interval, polling=polling)
+    try:
+        collect_stats(root, cache=LineCountCache(), top_n=top_n, sloc=sloc, metrics=metrics,
+                      on_file=snapshot_file, executor=executor, workers=workers)
+        write_json_atomic(output, _results(live), indent=2)
+        if on_update is not None:
+            on_update(live, live.total_files)
+
+        while True:
+            files, dirs = watcher.changes()
+            touched = apply_changes(live, root, files, dirs, options)
+            if touched:
+                write_json_atomic(output, _results(live), indent=2)
+                if on_update is not None:
+                    on_update(live, touched)
+    finally:
+        watcher.close()
@@ -4,124 +4,551 @@ Extract form fields from Formidable XML export for ShakaPT
 Comprehensive Lifestyle and Wellness Questionnaire
 """
 
+import argparse
+import mmap
+import os
 import xml.etree.ElementTree as ET
 import json
 import re
+from collections import OrderedDict
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
 
-def parse_field_options(options_str):
-    """Parse the options string to extract field options"""
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+XML_FILE = '/Users/blakelange/Downloads/shakapt.formidable.2023-09-10.xml'
+OUTPUT_FILE = '/Users/blakelange/vibelux-app/shakapt_questionnaire_fields.json'
+FORM_KEY = 'comprehensivelifestyleandwellnessquestionnaire2'
+# One <form_key>.json per form when several forms are extracted
+FORMS_DIR = '/Users/blakelange/vibelux-app/formidable_forms'
+
+# Byte-offset index kept next to the export as <export>.index.json
+INDEX_SUFFIX = '.index.json'
+INDEX_VERSION = 1
+
+_FORM_TAG = re.compile(rb'<(/?)(form|field)>')
+_ID = re.compile(rb'<id>\s*(?:<!\[CDATA\[)?(.*?)(?:\]\]>)?\s*</id>', re.S)
+_FORM_KEY = re.compile(rb'<form_key>\s*(?:<!\[CDATA\[)?(.*?)(?:\]\]>)?\s*</form_key>', re.S)
+
+# Normalized layout (--normalize): every distinct non-empty options list is
+# stored once in a top-level OPTION_SETS table, and each record that used
+# it holds OPTION_SET_REF: <index into the table> in place of 'options'
+OPTION_SETS = 'option_sets'
+OPTION_SET_REF = 'option_set'
+
+# Undecoded blobs handed to each worker, and the fewest worth a process pool
+DECODE_BATCH_SIZE = 256
+POOL_MIN_BLOBS = 2000
+# Distinct blobs remembered from one form to the next; the least recently
+# used are forgotten, so memory stays flat however many forms an export holds
+DECODE_MEMO_SIZE = 4096
+
+# Outcome of decoding one options blob
+_DECODED, _BLANK, _INVALID = 0, 1, 2
+
+# orjson turns integers beyond 64 bits into floats; blobs with digit runs this long go to json
+_LONG_DIGITS = re.compile(r'\d{19}')
+
+# Raw blob -> (outcome, value) for the DECODE_MEMO_SIZE most recently used
+# blobs, carried over between forms. Identical option sets (the Likert
+# scales repeat on hundreds of fields) are decoded once and share one value
+_decoded_blobs = OrderedDict()
+
+# Field children holding JSON blobs; their columns take a decode_blobs() map
+BLOB_TAGS = ('options', 'field_options')
+
+def _decode_blob(raw):
+    """(outcome, value) for one options or field_options blob"""
+    # Remove CDATA wrapper if present
+    clean_str = raw.replace('<![CDATA[', '').replace(']]>', '')
+    if clean_str.strip() == '':
+        return _BLANK, None
+    if orjson is not None and not _LONG_DIGITS.search(clean_str):
+        try:
+            return _DECODED, orjson.loads(clean_str)
+        except orjson.JSONDecodeError:
+            # orjson rejects what json accepts (NaN, Infinity); let json have a go
+            pass
+    try:
+        return _DECODED, json.loads(clean_str)
+    except (ValueError, RecursionError):
+        return _INVALID, None
+
+def _decode_batch(blobs):
+    """Worker: (outcome, value) for each blob"""
+    return [_decode_blob(raw) for raw in blobs]
+
+def _remember(raw, outcome):
+    _decoded_blobs[raw] = outcome
+    if len(_decoded_blobs) > DECODE_MEMO_SIZE:
+        _decoded_blobs.popitem(last=False)
+
+def decode_blobs(blobs, workers=None):
+    """{raw: (outcome, value)} for a batch of options blobs
+
+    Blobs in the shared memo are not decoded again, nor are repeats within
+    the batch. With workers > 1 and enough new blobs, they are decoded over
+    a process pool; otherwise serially (with orjson when it is installed).
+    The returned map covers the whole batch however large it is; only what
+    carries over to the next batch is bounded by the memo.
+    """
+    decoded = {}
+    pending = []
+    for raw in dict.fromkeys(blobs):
+        if not raw:
+            continue
+        outcome = _decoded_blobs.get(raw)
+        if outcome is None:
+            pending.append(raw)
+        else:
+            _decoded_blobs.move_to_end(raw)
+            decoded[raw] = outcome
+    if workers and workers > 1 and len(pending) >= POOL_MIN_BLOBS:
+        batches = [pending[i:i + DECODE_BATCH_SIZE] for i in range(0, len(pending), DECODE_BATCH_SIZE)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = [outcome for batch in pool.map(_decode_batch, batches) for outcome in batch]
+    else:
+        results = _decode_batch(pending)
+    for raw, outcome in zip(pending, results):
+        decoded[raw] = outcome
+        _remember(raw, outcome)
+    return decoded
+
+def decoded_blob(raw, decoded=None):
+    """(outcome, value) for one blob, from a decode_blobs() map or through the shared memo"""
+    if decoded is not None and raw in decoded:
+        return decoded[raw]
+    outcome = _decoded_blobs.get(raw)
+    if outcome is None:
+        outcome = _decode_blob(raw)
+        _remember(raw, outcome)
+    else:
+        _decoded_blobs.move_to_end(raw)
+    return outcome
+
+def parse_field_options(options_str, decoded=None):
+    """Parse the options string to extract field options
+
+    decoded is an optional decode_blobs() map to take the result from.
+    The result is read-only: every field with the same options blob, in
+    this form or another, gets the same list object. Copy it before
+    changing it (copy.deepcopy(field['options'])).
+    """
     if not options_str:
         return []
     
-    try:
-        # Remove CDATA wrapper if present
-        clean_str = options_str.replace('<![CDATA[', '').replace(']]>', '')
-        if clean_str.strip() == '':
-            return []
-        
-        # Try to parse as JSON
-        options = json.loads(clean_str)
+    outcome, options = decoded_blob(options_str, decoded)
+    if outcome == _DECODED:
         return options
-    except:
-        return options_str
+    return [] if outcome == _BLANK else options_str
 
-def parse_field_options_config(field_options_str):
-    """Parse the field_options configuration"""
+def parse_field_options_config(field_options_str, decoded=None):
+    """Parse the field_options configuration
+
+    Read-only, shared between fields with the same blob, as with
+    parse_field_options
+    """
     if not field_options_str:
         return {}
     
-    try:
-        clean_str = field_options_str.replace('<![CDATA[', '').replace(']]>', '')
-        if clean_str.strip() == '':
-            return {}
-        
-        config = json.loads(clean_str)
-        return config
-    except:
-        return {}
+    outcome, config = decoded_blob(field_options_str, decoded)
+    return config if outcome == _DECODED else {}
 
-def extract_form_fields(xml_file_path):
-    """Extract all fields from the comprehensive questionnaire form"""
-    
-    # Read the XML file in chunks to handle large file
+# (output key, child tag, converter or None, default factory when the child is missing)
+FORM_COLUMNS = (
+    ('form_id', 'id', None, str),
+    ('form_key', 'form_key', None, str),
+    ('name', 'name', None, str),
+    ('description', 'description', None, str),
+    ('created_at', 'created_at', None, str),
+    ('status', 'status', None, str),
+)
+FIELD_COLUMNS = (
+    ('id', 'id', None, str),
+    ('field_key', 'field_key', None, str),
+    ('name', 'name', None, str),
+    ('description', 'description', None, str),
+    ('type', 'type', None, str),
+    ('default_value', 'default_value', None, str),
+    ('field_order', 'field_order', int, int),
+    ('required', 'required', lambda text: text == '1', bool),
+    # Options for select, radio and checkbox fields
+    ('options', 'options', parse_field_options, list),
+    ('field_config', 'field_options', parse_field_options_config, dict),
+)
+
+def child_texts(elem):
+    """tag -> text for an element's children in one pass; the first child with a tag wins, as with find()"""
+    return {child.tag: child.text for child in reversed(elem)}
+
+def _from_columns(texts, columns, decoded=None):
+    row = {}
+    for key, tag, convert, default in columns:
+        if tag in texts:
+            if not convert:
+                row[key] = texts[tag]
+            elif tag in BLOB_TAGS:
+                row[key] = convert(texts[tag], decoded)
+            else:
+                row[key] = convert(texts[tag])
+        else:
+            row[key] = default()
+    return row
+
+def form_metadata(root):
+    """Metadata of a <form> element, with an empty fields list"""
+    form_info = _from_columns(child_texts(root), FORM_COLUMNS)
+    form_info['fields'] = []
+    return form_info
+
+def field_data_from_element(field):
+    """Field dict for one <field> element"""
+    return _from_columns(child_texts(field), FIELD_COLUMNS)
+
+def fields_from_texts(field_texts, workers=None):
+    """Field dicts for a form's fields, given as child_texts maps
+
+    The options and field_options blobs of the whole form are decoded as
+    one batch (see decode_blobs) before the dicts are built
+    """
+    decoded = decode_blobs((texts.get(tag) for texts in field_texts for tag in BLOB_TAGS), workers)
+    return [_from_columns(texts, FIELD_COLUMNS, decoded) for texts in field_texts]
+
+def _form_end(content, form_opening):
+    """Index just past the </form> closing the form that opens at form_opening, or -1"""
+    form_level = 0
+    pos = form_opening
+    while True:
+        next_open = content.find('<form>', pos)
+        next_close = content.find('</form>', pos)
+        if next_close == -1:
+            return -1
+        if next_open != -1 and next_open < next_close:
+            form_level += 1
+            pos = next_open + 6
+        else:
+            form_level -= 1
+            pos = next_close + 7
+            if form_level == 0:
+                return pos
+
+def read_form(xml_file_path, form_key=FORM_KEY, workers=None):
+    """Read the whole export into memory and parse the form with form_key"""
     with open(xml_file_path, 'r', encoding='utf-8') as f:
         content = f.read()
     
     # Find the specific form section
-    form_start = content.find('<form_key><![CDATA[comprehensivelifestyleandwellnessquestionnaire2]]></form_key>')
+    form_start = content.find(f'<form_key><![CDATA[{form_key}]]></form_key>')
     if form_start == -1:
         print("Form not found!")
         return None
     
-    # Find the form opening tag before this
+    # Find the form opening tag before this, and its closing tag
     form_opening = content.rfind('<form>', 0, form_start)
-    
-    # Find the corresponding closing tag
-    form_level = 0
-    pos = form_opening
-    while pos < len(content):
-        if content[pos:pos+6] == '<form>':
-            form_level += 1
-        elif content[pos:pos+7] == '</form>':
-            form_level -= 1
-            if form_level == 0:
-                form_end = pos + 7
-                break
-        pos += 1
-    
-    # Extract the form XML
-    form_xml = content[form_opening:form_end]
+    form_end = _form_end(content, form_opening) if form_opening != -1 else -1
+    if form_end == -1:
+        print("Form element is not complete!")
+        return None
     
     # Parse with ElementTree
     try:
-        root = ET.fromstring(form_xml)
+        root = ET.fromstring(content[form_opening:form_end])
     except ET.ParseError as e:
         print(f"XML Parse Error: {e}")
         return None
     
-    # Extract form metadata
-    form_info = {
-        'form_id': root.find('id').text if root.find('id') is not None else '',
-        'form_key': root.find('form_key').text if root.find('form_key') is not None else '',
-        'name': root.find('name').text if root.find('name') is not None else '',
-        'description': root.find('description').text if root.find('description') is not None else '',
-        'created_at': root.find('created_at').text if root.find('created_at') is not None else '',
-        'status': root.find('status').text if root.find('status') is not None else '',
-        'fields': []
-    }
-    
-    # Extract all fields
-    fields = root.findall('field')
-    print(f"Found {len(fields)} fields in the form")
-    
-    for field in fields:
-        field_data = {}
-        
-        # Basic field info
-        field_data['id'] = field.find('id').text if field.find('id') is not None else ''
-        field_data['field_key'] = field.find('field_key').text if field.find('field_key') is not None else ''
-        field_data['name'] = field.find('name').text if field.find('name') is not None else ''
-        field_data['description'] = field.find('description').text if field.find('description') is not None else ''
-        field_data['type'] = field.find('type').text if field.find('type') is not None else ''
-        field_data['default_value'] = field.find('default_value').text if field.find('default_value') is not None else ''
-        field_data['field_order'] = int(field.find('field_order').text) if field.find('field_order') is not None else 0
-        field_data['required'] = field.find('required').text == '1' if field.find('required') is not None else False
-        
-        # Parse options (for select, radio, checkbox fields)
-        options_elem = field.find('options')
-        if options_elem is not None:
-            field_data['options'] = parse_field_options(options_elem.text)
-        else:
-            field_data['options'] = []
-        
-        # Parse field configuration
-        field_options_elem = field.find('field_options')
-        if field_options_elem is not None:
-            field_data['field_config'] = parse_field_options_config(field_options_elem.text)
-        else:
-            field_data['field_config'] = {}
-        
-        form_info['fields'].append(field_data)
+    form_info = form_metadata(root)
+    form_info['fields'] = fields_from_texts([child_texts(field) for field in root.findall('field')], workers)
+    return form_info
+
+def iter_forms(xml_file_path, form_keys=None, workers=None):
+    """Yield the form_info of every form (or every form in form_keys) in one pass
+
+    Uses iterparse and keeps memory flat: every element outside a <form>
+    is dropped from the tree as soon as it ends, and each <field> is
+    turned into a dict and dropped at its end tag, so only one form's
+    metadata and one field are ever held as elements. Fields of forms that
+    were not asked for are skipped, and parsing stops once every requested
+    form has been read. Each form's option blobs are decoded as one batch
+    when the form ends (see fields_from_texts). Fields are sorted by
+    field_order.
+    """
+    wanted = None if form_keys is None else set(form_keys)
+    stack = []
+    form = None
+    matched = None
+    fields = []
+    for event, elem in ET.iterparse(xml_file_path, events=('start', 'end')):
+        if event == 'start':
+            stack.append(elem)
+            if elem.tag == 'form' and form is None:
+                form, matched, fields = elem, None, []
+            continue
+        stack.pop()
+        parent = stack[-1] if stack else None
+        if form is not None and parent is form:
+            if elem.tag == 'form_key':
+                matched = wanted is None or (elem.text or '') in wanted
+            elif elem.tag == 'field':
+                # form_key comes before the fields in Formidable exports
+                if matched is not False:
+                    fields.append(child_texts(elem))
+                form.remove(elem)
+            continue
+        if elem is form:
+            if matched:
+                form_info = form_metadata(form)
+                form_info['fields'] = sorted(fields_from_texts(fields, workers), key=lambda x: x['field_order'])
+                yield form_info
+                if wanted is not None:
+                    wanted.discard(form_info['form_key'])
+                    if not wanted:
+                        return
+            form = None
+        if parent is not None and form is None:
+            parent.remove(elem)
+
+def stream_form(xml_file_path, form_key=FORM_KEY, workers=None):
+    """Parse the form with form_key with iterparse, keeping memory flat (see iter_forms)"""
+    form_info = next(iter_forms(xml_file_path, [form_key], workers), None)
+    if form_info is None:
+        print("Form not found!")
+    return form_info
+
+def extract_forms(xml_file_path, form_keys=None, workers=None):
+    """{form_key: form_info} for every form, or the requested ones, from one pass"""
+    return {form_info['form_key']: form_info for form_info in iter_forms(xml_file_path, form_keys, workers)}
+
+def form_output_path(output_dir, form_key):
+    """<output_dir>/<form_key>.json, with anything unsafe in the key replaced"""
+    return os.path.join(output_dir, re.sub(r'[^\w.-]', '_', form_key or 'form') + '.json')
+
+def normalize_options(document):
+    """Copy of document with its options lists interned into an OPTION_SETS table
+
+    Every dict at any depth with a non-empty 'options' list gets an
+    OPTION_SET_REF instead, so the Likert scales repeated across dozens of
+    fields are written once. expand_options undoes it.
+    """
+    option_sets = []
+    ids = {}
+    
+    def intern(value):
+        if isinstance(value, list):
+            return [intern(item) for item in value]
+        if not isinstance(value, dict):
+            return value
+        record = {}
+        for key, item in value.items():
+            if key == 'options' and isinstance(item, list) and item:
+                signature = json.dumps(item, ensure_ascii=False, separators=(',', ':'))
+                if signature not in ids:
+                    ids[signature] = len(option_sets)
+                    option_sets.append(item)
+                record[OPTION_SET_REF] = ids[signature]
+            else:
+                record[key] = intern(item)
+        return record
+    
+    normalized = intern(document)
+    normalized[OPTION_SETS] = option_sets
+    return normalized
+
+def expand_options(value, option_sets):
+    """value with every OPTION_SET_REF replaced by its options list (shared, not copied)"""
+    if isinstance(value, list):
+        return [expand_options(item, option_sets) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {'options' if key == OPTION_SET_REF else key:
+            option_sets[item] if key == OPTION_SET_REF else expand_options(item, option_sets)
+            for key, item in value.items()}
+
+class ExpandedFields(Sequence):
+    """Read-only view of a normalized form's fields, each expanded the first time it is read
+
+    Supports len(), indexing, slicing and iteration only; it is not a list,
+    so there is no sort(), + or json.dump(). Use to_list() for those.
+    """
+    
+    def __init__(self, fields, option_sets):
+        self._fields = fields
+        self._option_sets = option_sets
+        self._expanded = [None] * len(fields)
+    
+    def __len__(self):
+        return len(self._fields)
+    
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        field = self._expanded[i]
+        if field is None:
+            field = self._expanded[i] = expand_options(self._fields[i], self._option_sets)
+        return field
+    
+    def to_list(self):
+        """Every field, expanded, as a plain list"""
+        return self[:]
+
+def load_form(json_file_path, lazy=False):
+    """A form_info JSON file in either layout, with 'fields' as a plain list
+
+    lazy=True hands back a normalized file's fields as an ExpandedFields
+    view instead, so only the fields actually read pay for restoring their
+    options; plain files always give a list
+    """
+    with open(json_file_path, 'r', encoding='utf-8') as f:
+        form_info = json.load(f)
+    option_sets = form_info.pop(OPTION_SETS, None)
+    if option_sets is not None:
+        fields = ExpandedFields(form_info['fields'], option_sets)
+        form_info['fields'] = fields if lazy else fields.to_list()
+    return form_info
+
+def write_json(document, path, normalize=False):
+    """Write a form_info (or any document with 'options' lists), optionally normalized"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(normalize_options(document) if normalize else document, f, indent=2, ensure_ascii=False)
+
+def write_forms(forms, output_dir=FORMS_DIR, normalize=False):
+    """Write each form_info from an iterable to its own JSON file; yields (form_info, path)"""
+    os.makedirs(output_dir, exist_ok=True)
+    for form_info in forms:
+        path = form_output_path(output_dir, form_info['form_key'])
+        write_json(form_info, path, normalize)
+        yield form_info, path
+
+def build_form_index(xml_file_path):
+    """Byte offsets of every form and field in an export, from one regex scan
+
+    The scan runs over a memory map of the raw bytes and never parses XML:
+    <form>/</form> and <field>/</field> tags give the element spans, and
+    each form's key and id (and each field's id) are its first <form_key>
+    and <id> children
+    """
+    st = os.stat(xml_file_path)
+    index = {'version': INDEX_VERSION, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+             'forms': {}, 'form_ids': {}, 'fields': {}}
+    if st.st_size == 0:
+        return index
+    
+    with open(xml_file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        depth = 0
+        form_start = field_start = None
+        spans = []
+        for m in _FORM_TAG.finditer(mm):
+            closing, tag = m.group(1), m.group(2)
+            if tag == b'form':
+                if not closing:
+                    depth += 1
+                    if depth == 1:
+                        form_start, spans = m.start(), []
+                    continue
+                depth -= 1
+                if depth or form_start is None:
+                    continue
+                # The form's own children come before its first field
+                head_end = spans[0][0] if spans else m.end()
+                key = _FORM_KEY.search(mm, form_start, head_end)
+                form_id = _ID.search(mm, form_start, head_end)
+                key = key.group(1).decode('utf-8') if key else ''
+                form_id = form_id.group(1).decode('utf-8') if form_id else ''
+                index['forms'][key] = {'id': form_id, 'start': form_start, 'end': m.end()}
+                index['form_ids'][form_id] = key
+                for start, end in spans:
+                    field_id = _ID.search(mm, start, end)
+                    if field_id:
+                        index['fields'][field_id.group(1).decode('utf-8')] = [start, end, key]
+                form_start = None
+            elif depth == 1:
+                if not closing:
+                    field_start = m.start()
+                elif field_start is not None:
+                    spans.append((field_start, m.end()))
+                    field_start = None
+    return index
+
+def form_index_path(xml_file_path):
+    return xml_file_path + INDEX_SUFFIX
+
+def load_form_index(xml_file_path):
+    """The sidecar index, rebuilt (and saved when possible) if the export's size or mtime changed"""
+    st = os.stat(xml_file_path)
+    index_path = form_index_path(xml_file_path)
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if (index.get('version') == INDEX_VERSION and index.get('size') == st.st_size
+                and index.get('mtime_ns') == st.st_mtime_ns):
+            return index
+    except (OSError, ValueError):
+        pass
+    
+    index = build_form_index(xml_file_path)
+    try:
+        tmp_path = index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(tmp_path, index_path)
+    except OSError:
+        # Read-only location: use the index for this run only
+        pass
+    return index
+
+def _read_span(xml_file_path, start, end):
+    with open(xml_file_path, 'rb') as f:
+        f.seek(start)
+        return f.read(end - start)
+
+def read_indexed_form(xml_file_path, form_key=None, form_id=None, index=None, workers=None):
+    """Parse one form by key or id, reading only its bytes from the export"""
+    if index is None:
+        index = load_form_index(xml_file_path)
+    if form_key is None:
+        form_key = index['form_ids'].get(str(form_id))
+    entry = index['forms'].get(form_key)
+    if entry is None:
+        print("Form not found!")
+        return None
+    
+    root = ET.fromstring(_read_span(xml_file_path, entry['start'], entry['end']))
+    form_info = form_metadata(root)
+    form_info['fields'] = fields_from_texts([child_texts(field) for field in root.findall('field')], workers)
+    return form_info
+
+def read_indexed_field(xml_file_path, field_id, index=None):
+    """Parse one field by id, reading only its bytes; adds the owning 'form_key'"""
+    if index is None:
+        index = load_form_index(xml_file_path)
+    entry = index['fields'].get(str(field_id))
+    if entry is None:
+        return None
+    start, end, form_key = entry
+    field_data = field_data_from_element(ET.fromstring(_read_span(xml_file_path, start, end)))
+    field_data['form_key'] = form_key
+    return field_data
+
+def extract_form_fields(xml_file_path, form_key=FORM_KEY, stream=True, workers=None):
+    """Extract all fields from the comprehensive questionnaire form
+
+    stream=True parses the export incrementally (see stream_form);
+    stream=False reads it whole, which is only sensible for small files;
+    stream='index' seeks straight to the form through the sidecar index.
+    workers > 1 decodes large batches of option blobs over a process pool
+    """
+    if stream == 'index':
+        form_info = read_indexed_form(xml_file_path, form_key, workers=workers)
+    elif stream:
+        form_info = stream_form(xml_file_path, form_key, workers)
+    else:
+        form_info = read_form(xml_file_path, form_key, workers)
+    if form_info is None:
+        return None
+    print(f"Found {len(form_info['fields'])} fields in the form")
     
     # Sort fields by field_order
     form_info['fields'].sort(key=lambda x: x['field_order'])
@@ -129,17 +556,49 @@ def extract_form_fields(xml_file_path):
     return form_info
 
 def main():
-    xml_file = '/Users/blakelange/Downloads/shakapt.formidable.2023-09-10.xml'
+    parser = argparse.ArgumentParser(description="Extract form fields from a Formidable XML export")
+    parser.add_argument('xml_file', nargs='?', default=XML_FILE, help="Formidable export")
+    parser.add_argument('-o', '--output', default=OUTPUT_FILE, help="JSON file to write")
+    parser.add_argument('--form-key', action='append',
+                        help=f"form to extract; repeat to write one file per form (default: {FORM_KEY})")
+    parser.add_argument('--all-forms', action='store_true',
+                        help="extract every form in one pass, one file per form")
+    parser.add_argument('--output-dir', default=FORMS_DIR,
+                        help="directory for the per-form files (default: %(default)s)")
+    parser.add_argument('--in-memory', action='store_true',
+                        help="read the whole export at once instead of streaming it")
+    parser.add_argument('--index', action='store_true',
+                        help=f"seek to the form through a byte-offset index kept in <export>{INDEX_SUFFIX}")
+    parser.add_argument('--normalize', action='store_true',
+                        help=f"store each distinct options list once under '{OPTION_SETS}' and refer "
+                             f"to it by index from each field's '{OPTION_SET_REF}'")
+    parser.add_argument('--workers', type=int,
+                        help=f"processes for decoding option blobs (used from {POOL_MIN_BLOBS} new blobs a form)")
+    args = parser.parse_args()
+    xml_file = args.xml_file
+    
+    if args.all_forms or (args.form_key and len(args.form_key) > 1):
+        print("Extracting forms from the Formidable export in one pass...")
+        written = 0
+        form_keys = None if args.all_forms else args.form_key
+        for form_info, path in write_forms(iter_forms(xml_file, form_keys, args.workers), args.output_dir,
+                                           args.normalize):
+            written += 1
+            print(f"✅ {form_info['form_key']}: {len(form_info['fields'])} fields -> {path}")
+        print(f"\n📄 {written} forms saved to: {args.output_dir}")
+        return written
     
     print("Extracting form fields from ShakaPT Comprehensive Lifestyle and Wellness Questionnaire...")
     
-    form_data = extract_form_fields(xml_file)
+    form_key = args.form_key[0] if args.form_key else FORM_KEY
+    form_data = extract_form_fields(xml_file, form_key,
+                                    stream='index' if args.index else not args.in_memory,
+                                    workers=args.workers)
     
     if form_data:
         # Save to JSON file
-        output_file = '/Users/blakelange/vibelux-app/shakapt_questionnaire_fields.json'
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(form_data, f, indent=2, ensure_ascii=False)
+        output_file = args.output
+        write_json(form_data, output_file, args.normalize)
         
         print(f"✅ Extracted {len(form_data['fields'])} fields")
         print(f"📄 Data saved to: {output_file}")
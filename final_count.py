@@ -1,99 +1,165 @@
-import os
+import argparse
 import json
+import os
+import subprocess
 
-def count_lines_and_files(directory):
-    extensions = ['.ts', '.tsx', '.js', '.jsx']
-    exclude_dirs = {'node_modules', '.next', 'dist', 'build', 'temp_disabled', '.git'}
-    
-    results = {
-        'total_files': 0,
-        'total_lines': 0,
-        'by_extension': {},
-        'by_directory': {},
-        'largest_files': []
-    }
-    
-    file_data = []
-    
-    for root, dirs, files in os.walk(directory):
-        # Remove excluded directories
-        dirs[:] = [d for d in dirs if d not in exclude_dirs]
-        
-        # Skip if path contains excluded directories
-        if any(exc in root for exc in exclude_dirs):
-            continue
-        
-        relative_dir = root.replace(directory, '').lstrip('/')
-        if not relative_dir:
-            relative_dir = 'root'
-            
-        for file in files:
-            if any(file.endswith(ext) for ext in extensions):
-                filepath = os.path.join(root, file)
-                ext = os.path.splitext(file)[1]
-                
-                try:
-                    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                        lines = len(f.readlines())
-                        
-                    results['total_files'] += 1
-                    results['total_lines'] += lines
-                    
-                    # Track by extension
-                    if ext not in results['by_extension']:
-                        results['by_extension'][ext] = {'files': 0, 'lines': 0}
-                    results['by_extension'][ext]['files'] += 1
-                    results['by_extension'][ext]['lines'] += lines
-                    
-                    # Track by directory
-                    dir_key = relative_dir.split('/')[0] if '/' in relative_dir else relative_dir
-                    if dir_key not in results['by_directory']:
-                        results['by_directory'][dir_key] = {'files': 0, 'lines': 0}
-                    results['by_directory'][dir_key]['files'] += 1
-                    results['by_directory'][dir_key]['lines'] += lines
-                    
-                    # Track largest files
-                    file_data.append({
-                        'path': filepath.replace(directory, ''),
-                        'lines': lines,
-                        'extension': ext
-                    })
-                    
-                except:
-                    pass
-    
-    # Get top 10 largest files
-    file_data.sort(key=lambda x: x['lines'], reverse=True)
-    results['largest_files'] = file_data[:10]
-    
-    return results
-
-# Run the count
-results = count_lines_and_files('.')
-
-# Output results
-print("VIBELUX APPLICATION CODE STATISTICS")
-print("=" * 60)
-print(f"\nTOTAL FILES: {results['total_files']:,}")
-print(f"TOTAL LINES OF CODE: {results['total_lines']:,}")
-
-print("\n\nBREAKDOWN BY FILE TYPE:")
-print("-" * 40)
-for ext, data in sorted(results['by_extension'].items()):
-    print(f"{ext:5} files: {data['files']:6,} | Lines: {data['lines']:10,}")
-
-print("\n\nBREAKDOWN BY DIRECTORY:")
-print("-" * 40)
-for dir_name, data in sorted(results['by_directory'].items(), key=lambda x: x[1]['lines'], reverse=True)[:15]:
-    print(f"{dir_name:20} | Files: {data['files']:6,} | Lines: {data['lines']:10,}")
-
-print("\n\nLARGEST FILES:")
-print("-" * 60)
-for file_info in results['largest_files']:
-    print(f"{file_info['lines']:6,} lines | {file_info['path']}")
-
-# Save detailed results
-with open('code_statistics.json', 'w') as f:
-    json.dump(results, f, indent=2)
+from code_stats import EXECUTORS, LineCountCache, collect_stats
+from code_stats_git import collect_git_stats
+from code_stats_ignore import IGNORE_FILES, IgnoreRules
+from code_stats_snapshot import SNAPSHOT_FILE, write_snapshot
+from code_stats_watch import POLL_INTERVAL, watch
+
+OUTPUT_FILE = 'code_statistics.json'
+LARGEST_FILES = 10
+
+def count_lines_and_files(directory, cache=None, top_n=LARGEST_FILES, sloc=False, on_file=None,
+                          metrics=False, executor='auto', workers=None, ignore=None):
+    # Paths skipped by ignore rules keep their cache entries for unfiltered runs
+    return collect_stats(directory, cache=cache, top_n=top_n, sloc=sloc, metrics=metrics,
+                         on_file=on_file, executor=executor, workers=workers, ignore=ignore,
+                         prune=ignore is None).to_dict()
+
+def count_tracked_files(directory, rev=None, top_n=LARGEST_FILES, sloc=False, on_file=None,
+                        metrics=False):
+    return collect_git_stats(directory, rev or None, top_n=top_n, sloc=sloc, metrics=metrics,
+                             on_file=on_file).to_dict()
+
+def main():
+    parser = argparse.ArgumentParser(description="Count lines of code in the Vibelux application")
+    parser.add_argument('-o', '--output', default=OUTPUT_FILE, metavar='FILE',
+                        help="where to write the JSON results (default: %(default)s)")
+    parser.add_argument('--sloc', action='store_true',
+                        help="split physical lines into code, comment and blank")
+    parser.add_argument('--metrics', action='store_true',
+                        help="count imports, exports and JSX elements per file and directory")
+    parser.add_argument('--respect-ignore', action='store_true',
+                        help=f"skip paths matched by {', '.join(IGNORE_FILES)}")
+    parser.add_argument('--git', nargs='?', const='', metavar='REV',
+                        help="count tracked files from the git index, or the tree at REV")
+    parser.add_argument('--snapshot', nargs='?', const=SNAPSHOT_FILE, metavar='FILE',
+                        help=f"also write every file's line count to a binary snapshot (default: {SNAPSHOT_FILE})")
+    parser.add_argument('--executor', choices=EXECUTORS, default='auto',
+                        help="run reads serially, on threads (slow network/overlay filesystems), "
+                             "on processes, or pick from a latency probe (default: %(default)s)")
+    parser.add_argument('--workers', type=int, help="threads or processes to use")
+    parser.add_argument('--watch', action='store_true',
+                        help="keep the JSON results current as files change (Ctrl-C to stop)")
+    parser.add_argument('--poll', action='store_true',
+                        help="with --watch, poll for changes instead of using inotify")
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL,
+                        help="seconds between polls (default: %(default)s)")
+    args = parser.parse_args()
+    output = args.output
+    count_sloc = args.sloc
+    count_metrics = args.metrics
+
+    if args.watch:
+        if args.git is not None:
+            parser.error("--watch follows the working tree and cannot be combined with --git")
+        if args.respect_ignore:
+            parser.error("--respect-ignore is not supported with --watch")
+        if args.snapshot is not None:
+            parser.error("--snapshot writes a one-off file and cannot be combined with --watch")
+
+        def report(live, touched):
+            print(f"{live.total_files:,} files | {live.total_lines:,} lines "
+                  f"({touched:,} files updated) -> {output}", flush=True)
+
+        try:
+            watch('.', output, LARGEST_FILES, count_sloc, args.interval, args.poll, on_update=report,
+                  metrics=count_metrics, executor=args.executor, workers=args.workers)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    # Per-file line counts, gathered only when a snapshot was asked for
+    per_file = []
+    on_file = (lambda relpath, counts: per_file.append((relpath, counts['lines']))) if args.snapshot else None
+
+    # What was counted, so results from a --git run never pass for the working tree's
+    if args.git is not None:
+        source = {'kind': 'git', 'rev': args.git or None}
+    else:
+        source = {'kind': 'working_tree', 'respect_ignore': args.respect_ignore}
+
+    if args.git is not None:
+        if args.respect_ignore:
+            parser.error("--git already counts tracked files only; drop --respect-ignore")
+        # Tracked blobs only, so untracked build output never leaks into the totals
+        try:
+            results = count_tracked_files('.', args.git, sloc=count_sloc, on_file=on_file,
+                                          metrics=count_metrics)
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            parser.error(f"cannot read git revision {args.git!r}" if args.git else "cannot read the git index")
+    else:
+        # Unchanged files are served from the line count cache
+        cache = LineCountCache()
+        results = count_lines_and_files('.', cache, sloc=count_sloc, on_file=on_file, metrics=count_metrics,
+                                        executor=args.executor, workers=args.workers,
+                                        ignore=IgnoreRules.load('.') if args.respect_ignore else None)
+    results['source'] = source
+
+    # The cache is shared with the other scripts, so whether this run updated it says nothing
+    # about the tree; compare the fresh results with the file instead
+    unchanged = False
+    if os.path.exists(output):
+        try:
+            with open(output) as f:
+                unchanged = json.load(f) == json.loads(json.dumps(results))
+        except ValueError:
+            pass
+
+    # Output results
+    print("VIBELUX APPLICATION CODE STATISTICS")
+    print("=" * 60)
+    print(f"\nTOTAL FILES: {results['total_files']:,}")
+    print(f"TOTAL LINES OF CODE: {results['total_lines']:,}")
+
+    print("\n\nBREAKDOWN BY FILE TYPE:")
+    print("-" * 40)
+    for ext, data in sorted(results['by_extension'].items()):
+        print(f"{ext:5} files: {data['files']:6,} | Lines: {data['lines']:10,}")
+
+    if 'sloc' in results:
+        sloc = results['sloc']
+        print("\n\nSOURCE LINES (SLOC):")
+        print("-" * 40)
+        for ext, data in sorted(sloc['by_extension'].items()):
+            print(f"{ext:5} code: {data['code']:10,} | comment: {data['comment']:8,} | blank: {data['blank']:8,}")
+        total = sloc['total']
+        print(f"Total code: {total['code']:,} | comment: {total['comment']:,} | blank: {total['blank']:,}")
+
+    if 'metrics' in results:
+        metrics = results['metrics']
+        print("\n\nIMPORTS, EXPORTS AND JSX ELEMENTS:")
+        print("-" * 60)
+        for dir_name, data in sorted(metrics['by_directory'].items(), key=lambda x: x[1]['jsx'], reverse=True)[:15]:
+            print(f"{dir_name:40} | Imports: {data['imports']:7,} | Exports: {data['exports']:6,} | JSX: {data['jsx']:8,}")
+        total = metrics['total']
+        print(f"Total imports: {total['imports']:,} | exports: {total['exports']:,} | JSX elements: {total['jsx']:,}")
+
+    print("\n\nBREAKDOWN BY DIRECTORY:")
+    print("-" * 40)
+    for dir_name, data in sorted(results['by_directory'].items(), key=lambda x: x[1]['lines'], reverse=True)[:15]:
+        print(f"{dir_name:20} | Files: {data['files']:6,} | Lines: {data['lines']:10,}")
+
+    print("\n\nLARGEST FILES:")
+    print("-" * 60)
+    for file_info in results['largest_files']:
+        print(f"{file_info['lines']:6,} lines | {file_info['path']}")
+
+    # Save detailed results
+    if unchanged:
+        print(f"\n\nNo changes; {output} is up to date")
+    else:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
     
-print("\n\nDetailed results saved to code_statistics.json")
\ No newline at end of file
+        print(f"\n\nDetailed results saved to {output}")
+
+    if args.snapshot:
+        write_snapshot(args.snapshot, per_file)
+        print(f"Per-file snapshot of {len(per_file):,} files saved to {args.snapshot}")
+
+if __name__ == "__main__":
+    main()